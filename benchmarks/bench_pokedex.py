@@ -0,0 +1,135 @@
+"""Micro-benchmark indeks nama Pokémon.
+
+Jalankan dari root repo:
+    python benchmarks/bench_pokedex.py [--number 2000]
+
+Mengukur waktu per pencarian (µs) di pokedex.Pokedex atas seluruh
+data/pokemon.txt, dibandingkan dengan cara naif (hitung jarak Levenshtein
+ke setiap nama di daftar):
+- exact:   nama persis (beda huruf besar/tanda baca)
+- typo1:   satu huruf salah/hilang/lebih
+- typo2:   dua huruf salah
+- miss:    kata yang tidak mirip nama mana pun
+- prefix:  complete() untuk 3 huruf pertama
+
+Sebelum mengukur, check() menjalankan kasus regresi resolve() (RESOLVE_CASES).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pokedex import Pokedex, max_distance_for, normalize  # noqa: E402
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i]
+        for j, cb in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, previous[j] + 1, previous[j - 1] + (ca != cb)))
+        previous = row
+    return previous[-1]
+
+
+def naive_resolve(keys, query: str):
+    """Pembanding: normalisasi lalu Levenshtein ke semua nama"""
+    key = normalize(query)
+    if key in keys:
+        return keys[key]
+    limit = max_distance_for(key)
+    best = min(keys, key=lambda candidate: levenshtein(key, candidate))
+    return keys[best] if levenshtein(key, best) <= limit else None
+
+
+def typo(rng: random.Random, name: str, edits: int) -> str:
+    chars = list(name.lower())
+    for _ in range(edits):
+        pos = rng.randrange(len(chars))
+        op = rng.choice(('sub', 'del', 'ins'))
+        if op == 'sub':
+            chars[pos] = rng.choice('abcdefghijklmnopqrstuvwxyz')
+        elif op == 'del' and len(chars) > 1:
+            del chars[pos]
+        else:
+            chars.insert(pos, rng.choice('abcdefghijklmnopqrstuvwxyz'))
+    return ''.join(chars)
+
+
+# Regresi resolve(): (query, nama kanonik yang diharapkan atau None = harus jadi saran)
+RESOLVE_CASES = (
+    ('heatran', 'Heatran'),
+    ('Heatrann', 'Heatran'),
+    ('Mega-gengar', 'Mega Gengar'),
+    ('charzard', 'Charizard'),
+    ('shadow heatrn', 'Shadow Heatran'),
+    # Awalan nama lain tidak boleh dikoreksi ke nama pendek yang mirip
+    ('iron', None),
+    ('tapu', None),
+    # Jarak edit terlalu besar dibanding panjang query
+    ('mew2', None),
+    ('xyz', None),
+    # Kata tambahan menunjuk ke bentuk lain: saran, bukan spesies dasarnya
+    ('Charizard X', None),
+    # Awalan Shadow hanya boleh satu
+    ('shadow shadow mewtwo', None),
+)
+
+
+def check(pokedex: Pokedex):
+    for query, expected in RESOLVE_CASES:
+        name, suggestions = pokedex.resolve(query)
+        assert name == expected, (query, name, suggestions)
+    assert all(name.startswith('Iron ') for name in pokedex.resolve('iron')[1])
+    assert all(name.startswith('Tapu ') for name in pokedex.resolve('tapu')[1])
+    assert pokedex.resolve('Charizard X')[1][0] == 'Mega Charizard X'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pokedex lookups')
+    parser.add_argument('--number', type=int, default=2000, help='Lookups per case')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    pokedex = Pokedex.from_file()
+    load_ms = (time.perf_counter() - started) * 1000
+    print(f"Loaded {len(pokedex)} names / {pokedex.stats()['keys']} keys in {load_ms:.1f} ms")
+    check(pokedex)
+
+    rng = random.Random(args.seed)
+    # Nama panjang (>= 6 huruf) supaya typo2 masih dalam batas jarak
+    long_names = [name for name in pokedex.names if len(normalize(name)) >= 6]
+    cases = {
+        'exact': [rng.choice(pokedex.names).upper() for _ in range(200)],
+        'typo1': [typo(rng, rng.choice(long_names), 1) for _ in range(200)],
+        'typo2': [typo(rng, rng.choice(long_names), 2) for _ in range(200)],
+        'miss': [''.join(rng.choice('qxzjvkw') for _ in range(rng.randint(6, 10))) for _ in range(200)],
+    }
+    keys = dict(pokedex._exact)
+
+    print(f"\n{'case':<8} {'index µs':>10} {'naive µs':>10} {'speedup':>8}")
+    for case, queries in cases.items():
+        batch = iter(queries * (args.number // len(queries) + 1))
+        index_us = timeit.timeit(lambda: pokedex.resolve(next(batch)), number=args.number) / args.number * 1e6
+        # Cara naif jauh lebih lambat: cukup satu putaran daftar query
+        batch = iter(queries)
+        naive_us = timeit.timeit(lambda: naive_resolve(keys, next(batch)), number=len(queries)) / len(queries) * 1e6
+        print(f"{case:<8} {index_us:>10.2f} {naive_us:>10.2f} {naive_us / index_us:>7.1f}x")
+
+    prefixes = iter([normalize(name)[:3] for name in pokedex.names] * (args.number // len(pokedex) + 1))
+    prefix_us = timeit.timeit(lambda: pokedex.complete(next(prefixes), limit=10), number=args.number) / args.number * 1e6
+    print(f"{'prefix':<8} {prefix_us:>10.2f}")
+
+    # Pastikan hasil index sama dengan pembanding untuk kasus yang tidak ambigu
+    mismatched = sum(1 for query in cases['exact'] + cases['miss']
+                     if pokedex.resolve(query)[0] != naive_resolve(keys, query))
+    print(f"\nmismatches vs naive (exact+miss): {mismatched}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Micro-benchmark render kartu raid.
+
+Jalankan dari root repo:
+    python benchmarks/bench_render.py [--number 2000]
+
+Membandingkan templates.render_raid_card dengan cara lama (f-string
+besar + keyboard baru setiap render) untuk raid dengan 1, 20 dan 100 peserta:
+- full: render kartu dari nol (cache kartu dibuang setiap kali)
+- tap:  satu peserta ganti status lalu kartu di-render ulang (incremental)
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup  # noqa: E402
+
+import templates  # noqa: E402
+from database import UserProfile  # noqa: E402
+from raid_cache import Participant, RaidState  # noqa: E402
+
+STATUSES = ('going', 'going', 'maybe', 'plus1')
+
+
+def profile_for(user_id: int) -> UserProfile:
+    return UserProfile(f"Trainer{user_id}", f"{user_id:04d} 5678 9012", 30 + user_id % 20,
+                       ("Red", "Blue", "Yellow")[user_id % 3])
+
+
+def make_raid(participants: int) -> RaidState:
+    initiator = UserProfile("Initiator", "1234 5678 9012", 40, "Yellow")
+    raid = RaidState("raid_1700000000_1", "Heatran", True, 5, 1700000300, 1, initiator)
+    raid.participants[1] = Participant(1, 'going', initiator)
+    for user_id in range(2, participants + 1):
+        raid.participants[user_id] = Participant(user_id, STATUSES[user_id % 4], profile_for(user_id))
+    return raid
+
+
+def legacy_render(raid: RaidState):
+    """Render versi lama (sebelum templates.py), untuk pembanding"""
+    raid_id = raid.raid_id
+    initiator_name, initiator_code, initiator_level, initiator_team = raid.initiator
+    going_text = "✅ **Going:**\n"
+    maybe_text = "❓ **Maybe:**\n"
+    plus1_text = "👥 **+1:**\n"
+    for participant in raid.participant_list():
+        p_name, p_code, p_level, p_team, p_status = participant
+        emoji = "✅" if p_status == "going" else "❓" if p_status == "maybe" else "👥"
+        participant_line = f"• {p_name} {emoji} Lvl {p_level} {p_team} - `{p_code}`\n"
+        if p_status == "going":
+            going_text += participant_line
+        elif p_status == "maybe":
+            maybe_text += participant_line
+        elif p_status == "plus1":
+            plus1_text += participant_line
+    boosted_text = "☀️ BOOSTED" if raid.is_boosted else "⚡ NORMAL"
+    raid_text = f"""
+**{raid_id}:** {raid.pokemon_name} {boosted_text}
+
+**Initiator:** {initiator_name} (Lvl {initiator_level} {initiator_team})
+**Trainer Code:** `{initiator_code}`
+**Invites in:** {raid.invite_time} minutes
+
+{going_text}
+{maybe_text if "❓" in maybe_text else ""}
+{plus1_text if "👥" in plus1_text else ""}
+            """
+    keyboard = [[
+        InlineKeyboardButton("✅ Yes", callback_data=f"join_{raid_id}"),
+        InlineKeyboardButton("❌ No", callback_data=f"leave_{raid_id}"),
+        InlineKeyboardButton("❓ Maybe", callback_data=f"maybe_{raid_id}"),
+        InlineKeyboardButton("👥 +1", callback_data=f"plus1_{raid_id}"),
+    ]]
+    return raid_text, InlineKeyboardMarkup(keyboard)
+
+
+def full_render(raid: RaidState):
+    raid.card = None
+    return templates.render_raid_card(raid)
+
+
+def tapper(render, participants: int):
+    """Satu tap: trainer acak join/ganti status/keluar, lalu render"""
+    rng = random.Random(1)
+    choices = STATUSES + (None,)
+
+    def tap(raid: RaidState):
+        user_id = rng.randrange(2, participants + 1) if participants > 1 else 2
+        raid.set_status(user_id, rng.choice(choices), profile_for(user_id))
+        return render(raid)
+    return tap
+
+
+def bench(func, raid: RaidState, number: int) -> float:
+    """Rata-rata mikrodetik per render (terbaik dari 5 putaran)"""
+    return min(timeit.repeat(lambda: func(raid), number=number, repeat=5)) / number * 1e6
+
+
+def check(count: int):
+    """Hasil render incremental harus sama dengan render versi lama"""
+    raid = make_raid(count)
+    tap = tapper(templates.render_raid_card, count)
+    for _ in range(200):
+        text, _ = tap(raid)
+        assert text == legacy_render(raid)[0].strip()
+    # Perubahan profil saja: baris diganti di tempat
+    raid.refresh(1, UserProfile("Renamed", "0000 0000 0000", 50, "Red"))
+    assert templates.render_raid_text(raid) == legacy_render(raid)[0].strip()
+    # Beberapa tap dalam satu jendela debounce (user yang sama bisa tap berkali-kali)
+    # sebelum satu render: urutan harus tetap sama dengan render penuh
+    rng = random.Random(count)
+    choices = STATUSES + (None,)
+    for _ in range(200):
+        for _ in range(rng.randint(2, 8)):
+            user_id = rng.randrange(2, min(count, 6) + 2)
+            raid.set_status(user_id, rng.choice(choices), profile_for(user_id))
+            if rng.random() < 0.2:
+                raid.refresh(user_id, profile_for(user_id))
+        assert templates.render_raid_text(raid) == legacy_render(raid)[0].strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000, help="Render per putaran")
+    args = parser.parse_args()
+
+    print(f"{'participants':>12} {'legacy (us)':>12} {'full (us)':>10} "
+          f"{'legacy tap (us)':>16} {'tap (us)':>9} {'speedup':>8}")
+    for count in (1, 20, 100):
+        check(count)
+        legacy = bench(legacy_render, make_raid(count), args.number)
+        full = bench(full_render, make_raid(count), args.number)
+        legacy_tap = bench(tapper(legacy_render, count), make_raid(count), args.number)
+        tap = bench(tapper(templates.render_raid_card, count), make_raid(count), args.number)
+        print(f"{count:>12} {legacy:>12.2f} {full:>10.2f} {legacy_tap:>16.2f} {tap:>9.2f} "
+              f"{legacy_tap / tap:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
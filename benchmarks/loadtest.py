@@ -0,0 +1,342 @@
+"""Load test bot terhadap Bot API palsu.
+
+Jalankan dari root repo:
+    python benchmarks/loadtest.py [--trainers 2000] [--updates 20000] [--rate 500]
+
+Application dibuat lewat bot_fix.build_application seperti biasa, tapi HTTP
+client ke Telegram diganti FakeTelegramAPI (BaseRequest yang menjawab dari
+memori dengan latency buatan), dan DB memakai file sementara. Skenario:
+1. registrasi: setiap trainer mengirim /nickname lalu /gamer
+2. campuran update (bobot lewat --mix): /newraid, burst tap tombol raid,
+   /list, inline query, /myprofile, spam teks dan command tidak dikenal
+
+Laporan: p50/p99/max latency per jenis update, throughput, request keluar
+per method Bot API, waktu DB per operasi (dari metrics.DB_QUERY_SECONDS) dan
+update yang dibuang rate limit per user (--trainers kecil = lebih banyak throttle).
+Secara default limit Telegram (30/detik, 20/menit per grup) dimatikan supaya
+yang terukur biaya bot sendiri; --telegram-limits memakai limit asli.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from telegram import Update  # noqa: E402
+from telegram.request import BaseRequest, RequestData  # noqa: E402
+
+import bot_fix  # noqa: E402
+import log_setup  # noqa: E402
+import metrics  # noqa: E402
+from outbound import OutboundScheduler  # noqa: E402
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'RaidBot', 'username': 'raid_bot'}
+POKEMON = ('Heatran', 'Mewtwo', 'Rayquaza', 'Kyogre', 'Groudon', 'Dialga', 'Palkia', 'Giratina')
+TEAMS = ('Red', 'Blue', 'Yellow')
+TAP_ACTIONS = ('join', 'join', 'maybe', 'plus1', 'leave')
+COMMANDS = {'nickname', 'gamer', 'newraid', 'list', 'myprofile'}
+DEFAULT_MIX = 'tap=70,list=8,inline=5,newraid=4,myprofile=3,spam=10,unknown=5'
+
+
+class FakeTelegramAPI(BaseRequest):
+    """Pengganti HTTP client PTB: jawab setiap method Bot API dari memori"""
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._message_ids = itertools.count(1_000_000)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: RequestData = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if endpoint == 'getMe':
+            result = BOT_USER
+        elif endpoint in ('sendMessage', 'editMessageText'):
+            chat_id = params.get('chat_id', 0)
+            result = {
+                'message_id': params.get('message_id') or next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'supergroup' if chat_id < 0 else 'private'},
+                'from': BOT_USER,
+                'text': params.get('text', ''),
+            }
+        else:
+            result = True
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+class Traffic:
+    """Pembuat update sintetis (dict JSON seperti dari getUpdates)"""
+
+    def __init__(self, bot, chat_id: int, trainers: int, seed: int):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.trainers = trainers
+        self.rng = random.Random(seed)
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        # raid_id = raid_<detik>_<user>: pembuat raid digilir supaya tidak bentrok di detik yang sama
+        self._creators = itertools.cycle(range(1001, trainers + 1001))
+
+    def _user(self, user_id: int) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': f"Trainer{user_id}"}
+
+    def _trainer(self) -> int:
+        return self.rng.randint(1, self.trainers) + 1000
+
+    def message(self, user_id: int, text: str) -> Update:
+        entities = []
+        if text.startswith('/'):
+            entities = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return Update.de_json({
+            'update_id': next(self._update_ids),
+            'message': {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': self.chat_id, 'type': 'supergroup'},
+                'from': self._user(user_id),
+                'text': text,
+                'entities': entities,
+            },
+        }, self.bot)
+
+    def callback(self, user_id: int, data: str, message_id: int) -> Update:
+        update_id = next(self._update_ids)
+        return Update.de_json({
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'from': self._user(user_id),
+                'chat_instance': str(self.chat_id),
+                'data': data,
+                'message': {'message_id': message_id, 'date': int(time.time()),
+                            'chat': {'id': self.chat_id, 'type': 'supergroup'}, 'text': 'raid'},
+            },
+        }, self.bot)
+
+    def inline_query(self, user_id: int, query: str) -> Update:
+        update_id = next(self._update_ids)
+        return Update.de_json({
+            'update_id': update_id,
+            'inline_query': {'id': str(update_id), 'from': self._user(user_id), 'query': query, 'offset': ''},
+        }, self.bot)
+
+    def registrations(self):
+        for user_id in range(1001, self.trainers + 1001):
+            yield self.message(user_id, f"/nickname Trainer{user_id} {user_id:04d} 5678 9012")
+            yield self.message(user_id, f"/gamer {self.rng.randint(20, 50)} {self.rng.choice(TEAMS)}")
+
+    def make(self, kind: str) -> Update:
+        """Satu update jenis kind; tap jatuh ke /newraid kalau belum ada raid aktif"""
+        user_id = self._trainer()
+        if kind == 'tap':
+            raids = [raid for raid in bot_fix.raid_cache.raids.values() if raid.message_id is not None]
+            if raids:
+                raid = self.rng.choice(raids)
+                return self.callback(user_id, f"{self.rng.choice(TAP_ACTIONS)}_{raid.raid_id}", raid.message_id)
+            kind = 'newraid'
+        if kind == 'newraid':
+            user_id = next(self._creators)
+            boosted = self.rng.choice(('yes', 'no'))
+            return self.message(user_id, f"/newraid {self.rng.choice(POKEMON)} {boosted} {self.rng.randint(1, 60)}")
+        if kind == 'list':
+            return self.message(user_id, "/list")
+        if kind == 'inline':
+            query = self.rng.choice(('', self.rng.choice(POKEMON).lower(), 'boosted'))
+            return self.inline_query(user_id, query)
+        if kind == 'myprofile':
+            return self.message(user_id, "/myprofile")
+        if kind == 'spam':
+            return self.message(user_id, f"anyone up for raids? #{self.rng.randint(1, 10 ** 6)}")
+        if kind == 'unknown':
+            return self.message(user_id, f"/trade{self.rng.randint(1, 99)}")
+        raise ValueError(f"Unknown update kind: {kind}")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'tap=70,list=10' -> {'tap': 70.0, 'list': 10.0}"""
+    mix = {}
+    for item in spec.split(','):
+        if '=' in item:
+            kind, weight = item.split('=', 1)
+            mix[kind.strip()] = float(weight)
+    return mix
+
+
+def update_kind(update: Update) -> str:
+    """Label laporan: 'tap', 'inline', nama command, 'unknown' (command tidak dikenal) atau 'spam'"""
+    if update.callback_query:
+        return 'tap'
+    if update.inline_query:
+        return 'inline'
+    text = update.message.text
+    if not text.startswith('/'):
+        return 'spam'
+    command = text.split()[0].lstrip('/')
+    return command if command in COMMANDS else 'unknown'
+
+
+async def replay(application, updates, rate: float, latencies: Dict[str, List[float]]) -> float:
+    """Proses update dengan laju `rate` per detik (0 = secepatnya); return durasi total.
+
+    Paralelisme dibatasi sama seperti produksi (CONCURRENT_UPDATES). Latency
+    diukur dari update dijadwalkan sampai handler selesai, jadi antrian ikut terhitung.
+    """
+    slots = asyncio.Semaphore(bot_fix.CONCURRENT_UPDATES)
+    tasks = set()
+
+    async def process(update: Update, scheduled: float):
+        kind = update_kind(update)
+        try:
+            async with slots:
+                await application.process_update(update)
+        finally:
+            latencies.setdefault(kind, []).append(time.perf_counter() - scheduled)
+
+    start = time.perf_counter()
+    for i, update in enumerate(updates):
+        scheduled = start + i / rate if rate else time.perf_counter()
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Bentuk update campuran bisa bergantung pada hasil update sebelumnya (raid yang sudah ada)
+        if callable(update):
+            update = update()
+        task = asyncio.create_task(process(update, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        if not rate and len(tasks) >= bot_fix.CONCURRENT_UPDATES * 4:
+            await asyncio.sleep(0)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return time.perf_counter() - start
+
+
+def percentile(values: List[float], q: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[int(q * 100) - 1]
+
+
+def report(title: str, latencies: Dict[str, List[float]], elapsed: float):
+    total = sum(len(values) for values in latencies.values())
+    print(f"\n== {title}: {total} updates in {elapsed:.2f}s ({total / elapsed:.0f} updates/s)")
+    print(f"{'kind':>12} {'count':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+    for kind, values in sorted(latencies.items(), key=lambda item: -len(item[1])):
+        print(f"{kind:>12} {len(values):>8} {percentile(values, 0.5) * 1000:>10.2f} "
+              f"{percentile(values, 0.99) * 1000:>10.2f} {max(values) * 1000:>10.2f}")
+
+
+def report_totals(api: FakeTelegramAPI, db_before: dict):
+    print("\n== Bot API requests")
+    for endpoint, count in sorted(api.calls.items(), key=lambda item: -item[1]):
+        print(f"{endpoint:>24} {count:>8}")
+
+    db_stats = bot_fix.db.stats()
+    queries = db_stats['queries'] - db_before['queries']
+    query_time = db_stats['query_time'] - db_before['query_time']
+    print(f"\n== DB: {queries} operations, {query_time * 1000:.1f}ms in DB thread")
+    print(f"{'operation':>28} {'count':>8} {'total (ms)':>11} {'avg (us)':>9}")
+    histogram = metrics.DB_QUERY_SECONDS
+    for (operation,) in sorted(histogram.series, key=lambda labels: -histogram.total(*labels)):
+        count = histogram.count(operation)
+        total = histogram.total(operation)
+        print(f"{operation:>28} {count:>8} {total * 1000:>11.2f} {total / count * 1e6:>9.1f}")
+
+    print(f"\n== Card updates: {bot_fix.card_updater.stats()}")
+    print(f"== Outbound: granted={bot_fix.outbound.granted} max_wait={bot_fix.outbound.max_wait:.3f}s "
+          f"retry_after={bot_fix.outbound.retry_after_count}")
+    print(f"== Pending: deletions={len(bot_fix.deletions)} raids={len(bot_fix.raid_cache.raids)} "
+          f"writes={bot_fix.raid_cache.stats()['pending_writes']}")
+    print(f"== Rate limit: {bot_fix.user_limiter.stats()}")
+
+
+async def run(args):
+    api = FakeTelegramAPI(args.api_latency / 1000)
+    if not args.telegram_limits:
+        # Limit Telegram dimatikan: yang diukur antrian & handler bot, bukan flood control
+        bot_fix.outbound = OutboundScheduler(overall_rate=1e6, overall_burst=1e6, group_rate=1e6,
+                                             group_burst=1e6, private_rate=1e6, private_burst=1e6)
+    application = bot_fix.build_application(bot_fix.parse_args([]), request=api)
+
+    await bot_fix.start_services()
+    async with application:
+        await application.start()
+        bot_fix.attach_bot(application.bot)
+        traffic = Traffic(application.bot, args.chat_id, args.trainers, args.seed)
+        db_before = bot_fix.db.stats()
+
+        latencies: Dict[str, List[float]] = {}
+        elapsed = await replay(application, traffic.registrations(), args.rate, latencies)
+        report("Registration", latencies, elapsed)
+
+        mix = parse_mix(args.mix)
+        kinds = traffic.rng.choices(list(mix), weights=list(mix.values()), k=args.updates)
+        stream = []
+        for kind in kinds:
+            # Burst tap: beberapa trainer menekan tombol berturut-turut
+            stream.extend([lambda kind=kind: traffic.make(kind)] * (args.burst if kind == 'tap' else 1))
+        latencies = {}
+        elapsed = await replay(application, stream[:args.updates], args.rate, latencies)
+        report("Mixed traffic", latencies, elapsed)
+
+        # Beri waktu edit kartu yang di-debounce dan write-behind untuk selesai
+        await asyncio.sleep(args.settle)
+        report_totals(api, db_before)
+
+        await bot_fix.detach_bot()
+        await application.stop()
+    await bot_fix.stop_services()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trainers', type=int, default=2000, help="Jumlah trainer yang registrasi")
+    parser.add_argument('--updates', type=int, default=20000, help="Jumlah update campuran setelah registrasi")
+    parser.add_argument('--rate', type=float, default=500, help="Update per detik (0 = secepatnya)")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Bobot jenis update, mis. 'tap=70,list=10,spam=20'")
+    parser.add_argument('--burst', type=int, default=5, help="Tap berturut-turut per burst tombol")
+    parser.add_argument('--api-latency', type=float, default=20, help="Latency Bot API palsu (ms)")
+    parser.add_argument('--telegram-limits', action='store_true', help="Pakai limit flood control Telegram asli")
+    parser.add_argument('--chat-id', type=int, default=-1001234567890)
+    parser.add_argument('--settle', type=float, default=2.0, help="Detik menunggu background task sebelum laporan")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', help="File DB (default: file sementara, dihapus setelah selesai)")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+
+    listener = log_setup.setup_logging(log_file=None, level=args.log_level)
+    bot_fix.register_metrics()
+    with tempfile.TemporaryDirectory() as tmp:
+        bot_fix.db.path = args.db or os.path.join(tmp, 'loadtest.db')
+        if not bot_fix.init_db():
+            listener.stop()
+            return
+        try:
+            asyncio.run(run(args))
+        finally:
+            bot_fix.db.close()
+            listener.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,116 +1,166 @@
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
-import sqlite3
-import datetime
+from telegram import Update
+from telegram.error import BadRequest
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, InlineQueryHandler, MessageHandler, TypeHandler, filters
 import re
 import asyncio
+import argparse
+import os
+import random
+import signal
+import sqlite3
 import time
-import sys
 import traceback
 
-# Konfigurasi logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('bot.log')
-    ]
-)
+from card_updater import RaidCardUpdater
+from database import Database
+from deletion import DeletionScheduler
+from expiry import ExpirySweeper
+from lobbies import SEATS
+import log_setup
+from maintenance import MaintenanceJob
+import metrics
+from outbound import OutboundScheduler
+from pokedex import Pokedex
+from profile_cache import ProfileCache
+from raid_cache import RaidCache, RaidState
+from raid_search import InlineRaidSearch, RaidFilter
+from ratelimit import UserRateLimiter
+import sharding
+import templates
+
+# Logging dipasang di main() lewat log_setup (antrian + thread listener, file di-rotate)
 logger = logging.getLogger(__name__)
 
 # Token bot Anda
 BOT_TOKEN = '8222235353:AAHycT7I4AypcwFfrl730NoOhzqtDEx-sDc'
 
+# Jumlah maksimal update yang diproses bersamaan
+CONCURRENT_UPDATES = 32
+
+# Group handler sebelum group 0: gate shard lalu rate limit per user (di PTB hanya satu
+# handler per group yang jalan, jadi keduanya butuh group sendiri)
+SHARD_GATE_GROUP = -2
+RATE_LIMIT_GROUP = -1
+
+# Rate limiter untuk semua request ke Telegram (flood control + retry RetryAfter)
+outbound = OutboundScheduler()
+
+# User yang boleh memakai /stats (env ADMIN_IDS, dipisah koma)
+ADMIN_IDS = {int(x) for x in os.environ.get('ADMIN_IDS', '').split(',') if x.strip()}
+
+# Supervisor: restart dengan exponential backoff + jitter (detik)
+RESTART_BASE_DELAY = 0.5
+RESTART_MAX_DELAY = 60
+RESTART_RESET_AFTER = 60      # backoff di-reset kalau bot sempat jalan selama ini
+HEALTH_CHECK_INTERVAL = 5
+supervisor_stats = {'restarts': 0}
+
+# Chat yang dilayani proses ini kalau bot dijalankan sebagai beberapa worker (diatur lewat CLI)
+shards = sharding.ShardMap()
+
+# Lokasi database dan data-access layer bersama (satu koneksi untuk semua handler)
+DB_PATH = 'raids.db'
+db = Database(DB_PATH)
+# Raid aktif disimpan di memori, perubahan peserta ditulis ke DB secara batch
+raid_cache = RaidCache(db, owns_chat=shards.owns_chat)
+# Profil trainer yang sering dicek (registrasi) - dibuang oleh /nickname dan /gamer
+profile_cache = ProfileCache()
+# Kalau di-shard, perubahan profil lewat shard lain hanya terlihat setelah TTL habis
+SHARDED_PROFILE_TTL = 30
+# Semua penghapusan pesan terjadwal lewat satu heap (tersimpan di DB, aman saat restart)
+deletions = DeletionScheduler(db, owns_chat=shards.owns_chat)
+
+# Rate limit per user sebelum semua handler; admin tidak dibatasi, pesan grup yang
+# di-throttle tetap dihapus
+user_limiter = UserRateLimiter(exempt=ADMIN_IDS,
+                               drop_message=lambda chat_id, message_id: deletions.schedule(chat_id, message_id, 0))
+# Edit kartu raid di-debounce per raid supaya tap beruntun jadi satu edit
+card_updater = RaidCardUpdater(templates.render_raid_card)
+# Raid expired disapu di background tepat saat waktunya habis (bukan saat /list)
+sweeper = ExpirySweeper(db, raid_cache, card_updater)
+# Retensi history + incremental VACUUM / PRAGMA optimize berkala (diatur lewat CLI)
+maintenance = MaintenanceJob(db)
+
+# Indeks nama Pokémon (data/pokemon.txt), dimuat sekali saat start
+pokedex = Pokedex.from_file()
+
+# Kalau di-shard, cache tiap shard hanya berisi chat miliknya; inline query dan /list di
+# chat pribadi (semua chat) dilayani dari salinan baca DB bersama yang di-load ulang berkala
+shared_raids = RaidCache(db)
+SHARED_RAIDS_MAX_AGE = 5
+
+# Pencarian raid lewat inline query (@bot heatran), dijawab dari snapshot cache
+# (diarahkan ke shared_raids di main() kalau bot di-shard)
+raid_search = InlineRaidSearch(raid_cache, pokedex)
+INLINE_CACHE_TIME = 10
+
+def register_metrics():
+    """Metrik dari counter/antrian yang sudah dicatat tiap komponen (dibaca saat scrape)"""
+    registry = metrics.REGISTRY
+    db.on_query = metrics.observe_db_query
+    registry.counter_callback('bot_db_queries_total', "Operasi DB yang dijalankan", lambda: db.queries)
+    registry.counter_callback('bot_db_query_seconds_total', "Total waktu di thread DB", lambda: db.query_time)
+    registry.counter_callback('bot_api_requests_total', "Request ke Bot API per method",
+                              lambda: outbound.stats()['requests'], ('method',))
+    registry.counter_callback('bot_api_retry_after_total', "Balasan RetryAfter dari Telegram",
+                              lambda: outbound.retry_after_count)
+    registry.gauge_callback('bot_api_queue_depth', "Request yang menunggu rate limiter per prioritas",
+                            lambda: {(name,): outbound.stats()[f'queue_depth_{name}'] for name in ('raid', 'reply', 'delete')},
+                            ('priority',))
+    registry.gauge_callback('bot_api_max_wait_seconds', "Waktu tunggu terlama di rate limiter",
+                            lambda: outbound.max_wait)
+    registry.gauge_callback('bot_pending_deletions', "Penghapusan pesan yang belum jatuh tempo", lambda: len(deletions))
+    registry.counter_callback('bot_deleted_messages_total', "Pesan yang sudah dihapus", lambda: deletions.deleted)
+    registry.counter_callback('bot_delete_requests_saved_total', "Request delete yang dihemat deleteMessages (batch)",
+                              lambda: deletions.requests_saved)
+    registry.gauge_callback('bot_active_raids', "Raid di cache", lambda: len(raid_cache.raids))
+    registry.gauge_callback('bot_pending_raid_writes', "Perubahan peserta yang belum ditulis ke DB",
+                            lambda: raid_cache.stats()['pending_writes'])
+    registry.gauge_callback('bot_pending_expiries', "Raid di heap sweeper", lambda: len(sweeper))
+    registry.counter_callback('bot_swept_raids_total', "Raid expired yang sudah diarsipkan", lambda: sweeper.swept)
+    registry.gauge_callback('bot_cached_keyboards', "Keyboard kartu raid yang di-cache (harus ikut turun saat raid expired)",
+                            templates.keyboard_cache_size)
+    registry.gauge_callback('bot_card_update_workers', "Task edit kartu raid yang aktif",
+                            lambda: card_updater.stats()['active_workers'])
+    registry.counter_callback('bot_card_edits_total', "Edit kartu raid",
+                              lambda: {('sent',): card_updater.edits, ('skipped',): card_updater.skipped},
+                              ('result',))
+    registry.gauge_callback('bot_profile_cache_hit_rate', "Hit rate cache profil",
+                            lambda: profile_cache.stats()['hit_rate'])
+    registry.counter_callback('bot_restarts_total', "Restart oleh supervisor", lambda: supervisor_stats['restarts'])
+    registry.counter_callback('bot_shard_updates_total', "Update yang diterima/dibuang gate shard",
+                              lambda: {('accepted',): shards.accepted, ('dropped',): shards.dropped},
+                              ('result',))
+    registry.counter_callback('bot_inline_queries_total', "Inline query yang dijawab dari snapshot",
+                              lambda: raid_search.queries)
+    registry.counter_callback('bot_inline_snapshot_rebuilds_total', "Snapshot hasil inline yang dibangun ulang",
+                              lambda: raid_search.rebuilds)
+    registry.counter_callback('bot_throttled_updates_total', "Update yang dibuang rate limit per user",
+                              lambda: {(kind,): count for kind, count in user_limiter.throttled.items()},
+                              ('kind',))
+
 # Inisialisasi database dengan error handling
 def init_db():
     try:
-        conn = sqlite3.connect('raids.db')
-        c = conn.cursor()
-        
-        # Tabel untuk user terdaftar
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      user_id INTEGER UNIQUE,
-                      username TEXT,
-                      in_game_name TEXT,
-                      trainer_code TEXT,
-                      trainer_level INTEGER,
-                      team_color TEXT,
-                      registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        
-        # Tabel untuk raid aktif
-        c.execute('''CREATE TABLE IF NOT EXISTS raids
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      raid_id TEXT UNIQUE,
-                      pokemon_name TEXT,
-                      is_boosted BOOLEAN DEFAULT 0,
-                      invite_time INTEGER DEFAULT 5,
-                      initiator_id INTEGER,
-                      status TEXT DEFAULT 'active',
-                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        
-        # Tabel untuk peserta raid
-        c.execute('''CREATE TABLE IF NOT EXISTS participants
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      raid_id TEXT,
-                      user_id INTEGER,
-                      status TEXT,
-                      joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        
-        conn.commit()
-        conn.close()
-        print("✅ Database initialized successfully!")
+        db.open()
+        version = db.migrate()
+        print(f"✅ Database initialized successfully! (schema v{version})")
         return True
     except Exception as e:
         print(f"❌ Database initialization failed: {e}")
         logger.error(f"Database init error: {e}")
         return False
 
-# Fungsi untuk menghapus pesan setelah delay
-async def delete_message_after_delay(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: int, delay: int = 30):
-    """Hapus pesan setelah delay tertentu (default 2 menit untuk command benar)"""
-    try:
-        await asyncio.sleep(delay)
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-        logger.info(f"Deleted message {message_id} after {delay} seconds")
-    except Exception as e:
-        logger.warning(f"Could not delete message {message_id}: {e}")
-
-# Fungsi untuk menghapus pesan secara langsung (untuk command salah)
-async def delete_message_immediately(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: int):
-    """Hapus pesan secara langsung"""
-    try:
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-        logger.info(f"Deleted message {message_id} immediately")
-    except Exception as e:
-        logger.warning(f"Could not delete message {message_id}: {e}")
-
-# Fungsi untuk membersihkan raid yang sudah expired
-def cleanup_expired_raids():
-    """Hapus raid yang sudah melewati waktu invite_time"""
-    try:
-        conn = sqlite3.connect('raids.db')
-        c = conn.cursor()
-        
-        # Hapus raid yang created_at + invite_time sudah lewat dari waktu sekarang
-        c.execute("""
-            DELETE FROM raids 
-            WHERE datetime(created_at, '+' || invite_time || ' minutes') < datetime('now')
-        """)
-        
-        deleted_count = c.rowcount
-        conn.commit()
-        conn.close()
-        
-        if deleted_count > 0:
-            logger.info(f"Cleaned up {deleted_count} expired raids")
-        
-        return deleted_count
-    except Exception as e:
-        logger.error(f"Error cleaning up expired raids: {e}")
-        return 0
+# Ambil profil trainer dari cache, query ke DB hanya kalau belum ada
+async def get_profile(user_id: int):
+    """Profil trainer (None kalau belum terdaftar)"""
+    profile = profile_cache.get(user_id)
+    if profile is None:
+        profile = await db.get_user(user_id)
+        if profile is not None:
+            profile_cache.put(user_id, profile)
+    return profile
 
 # Handler untuk member baru yang join group
 async def welcome_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -118,38 +168,7 @@ async def welcome_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE)
     try:
         # Cek jika ada member baru yang join
         for member in update.message.new_chat_members:
-            welcome_text = f"""
-👋 **Welcome {member.first_name} to Pokémon Go Remote Raids!** 👋
-
-☀️🔥☁️ **REMOTE RAIDS INVITES** ☀️🔥☁️
-
-📝 **REGISTRATION IS MANDATORY**
-
-‼️ **To get started, register first:**
-➡️ `/nickname <your in-game name> <trainer code>`
-➡️ `/gamer <Trainer level> <team colour>`
-
-💡 **Example:**
-`/nickname AshKetchum 1234 5678 9012`
-`/gamer 40 Yellow`
-
-🎯 **CREATE RAID:**
-`/newraid <Pokémon> <boosted> <time>`
-💡 **Example:** `/newraid Heatran yes 5`
-
-📋 **OTHER COMMANDS:**
-• `/help` - Show all commands
-• `/myprofile` - Check your registration
-• `/list` - Show active raids
-
-🚫 **RULES:**
-• Only raid commands allowed
-• Registration required before raiding
-• Stay online during raids
-• No spam or unrelated messages
-
-Happy raiding! 🎉
-            """
+            welcome_text = templates.welcome_member_text(member.first_name)
             
             # Kirim welcome message
             welcome_msg = await update.message.reply_text(
@@ -159,7 +178,7 @@ Happy raiding! 🎉
             )
             
             # Hapus welcome message setelah 10 menit
-            asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, welcome_msg.message_id, 600))
+            deletions.schedule(update.effective_chat.id, welcome_msg.message_id, 600)
             
             logger.info(f"Sent welcome message to new member: {member.first_name} (ID: {member.id})")
     
@@ -179,73 +198,23 @@ async def goodbye_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Command handlers - SEMUA COMMAND YANG BENAR
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        welcome_text = """
-☀️🔥☁️ WELCOME TO REMOTE RAIDS INVITES ☀️🔥☁️
-
-This is a global Group for Raid Invites, please follow the points below⬇️
-
-✅ Please use this bot to coordinate raids
-
-❗️ Use /help to see how to register📋
-❗️ Use /raid to see an example of what the command should look like🔍
-❗️ Use /rules to check the rules📖
-❗️✅ Share your code ONLY after the raid has been organised✅❗️
-
-📝 **REGISTRATION IS MANDATORY**
-
-‼️ To register use:
-➡️ Format: /nickname <your in-game name> <trainer code>
-⭕️ E.g.: /nickname MyInGameName 1234 5678 9012
-
-➡️ Format: /gamer <Trainer level> <team colour>
-⭕️ E.g.: /gamer 40 Yellow
-
-Type /help to get started!
-        """
-        message = await update.message.reply_text(welcome_text)
+        message = await update.message.reply_text(templates.START_TEXT)
         
         # Hapus pesan perintah setelah 2 menit (120 detik)
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, update.message.message_id, 5))
+        deletions.schedule(update.effective_chat.id, update.message.message_id, 5)
         # Hapus pesan balasan setelah 2 menit
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 120))
+        deletions.schedule(update.effective_chat.id, message.message_id, 120)
         
     except Exception as e:
         logger.error(f"Error in start command: {e}")
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        help_text = """
-🆘 **HOW TO USE THE BOT** 🆘
-
-📋 **REGISTRATION (MANDATORY):**
-• Use `/nickname <in-game name> <trainer code>` - Register your basic info
-• Use `/gamer <level> <team color>` - Register your level and team
-• Use `/myprofile` - Check your registration status
-
-🎯 **RAID COMMANDS:**
-• Use `/newraid <Pokémon> <boosted> <time>` - Create new raid
-• Use `/list` - See active raids
-• Use `/myraids` - See your joined raids
-
-🔍 **RAID FORMAT EXAMPLE:**
-`/newraid Heatran yes 5`
-
-📖 **Important Rules:**
-• Registration is mandatory
-• Writing for anything other than creating raid & registering is not allowed
-• Share your Trainer code ONLY during registration
-• Don't enroll into more than one raid at a time
-• Stay active and online in game during raid
-• English only in this group
-• No spoofing promotion
-
-Use /adminlist for any help
-        """
-        message = await update.message.reply_text(help_text)
+        message = await update.message.reply_text(templates.HELP_TEXT)
         
         # Hapus setelah 2 menit
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, update.message.message_id, 5))
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+        deletions.schedule(update.effective_chat.id, update.message.message_id, 5)
+        deletions.schedule(update.effective_chat.id, message.message_id, 30)
         
     except Exception as e:
         logger.error(f"Error in help command: {e}")
@@ -254,27 +223,10 @@ async def myprofile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user = update.effective_user
         
-        conn = sqlite3.connect('raids.db')
-        c = conn.cursor()
-        
-        c.execute("SELECT in_game_name, trainer_code, trainer_level, team_color FROM users WHERE user_id = ?", (user.id,))
-        user_data = c.fetchone()
-        conn.close()
+        user_data = await get_profile(user.id)
         
         if not user_data:
-            profile_text = """
-❌ **You are not registered!**
-
-📝 **REGISTRATION IS MANDATORY**
-
-‼️ To register use:
-➡️ /nickname <in-game name> <trainer code>
-➡️ /gamer <level> <team color>
-
-💡 **Example:**
-/nickname Ash 1234 5678 9012
-/gamer 40 Yellow
-            """
+            profile_text = templates.NOT_REGISTERED_TEXT
         else:
             in_game_name, trainer_code, trainer_level, team_color = user_data
             
@@ -299,22 +251,17 @@ async def myprofile(update: Update, context: ContextTypes.DEFAULT_TYPE):
         message = await update.message.reply_text(profile_text)
         
         # Hapus setelah 2 menit
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, update.message.message_id, 5))
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+        deletions.schedule(update.effective_chat.id, update.message.message_id, 5)
+        deletions.schedule(update.effective_chat.id, message.message_id, 30)
         
     except Exception as e:
         logger.error(f"Error in myprofile command: {e}")
 
 async def newraid(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    conn = None
     try:
         # Cek registrasi user
         user = update.effective_user
-        conn = sqlite3.connect('raids.db')
-        c = conn.cursor()
-        
-        c.execute("SELECT in_game_name, trainer_code, trainer_level, team_color FROM users WHERE user_id = ?", (user.id,))
-        user_data = c.fetchone()
+        user_data = await get_profile(user.id)
         
         if not user_data or not user_data[2] or not user_data[3]:
             message = await update.message.reply_text(
@@ -322,8 +269,8 @@ async def newraid(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "Use /myprofile to check your registration status."
             )
             # Untuk command salah, hapus langsung
-            asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-            asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 120))
+            deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+            deletions.schedule(update.effective_chat.id, message.message_id, 120)
             return
         
         if len(context.args) < 3:
@@ -331,20 +278,32 @@ async def newraid(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "❌ Invalid format! Use: /newraid <Pokemon> <boosted> <time>\nExample: /newraid Heatran yes 5"
             )
             # Untuk command salah, hapus langsung
-            asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-            asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 120))
+            deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+            deletions.schedule(update.effective_chat.id, message.message_id, 120)
             return
         
-        pokemon_name = context.args[0].capitalize()
-        is_boosted = context.args[1].lower()
-        invite_time_str = context.args[2]
+        # Nama boleh lebih dari satu kata ("Mega Charizard X"); boosted dan time selalu di akhir
+        pokemon_query = " ".join(context.args[:-2])
+        is_boosted = context.args[-2].lower()
+        invite_time_str = context.args[-1]
+        
+        pokemon_name, suggestions = pokedex.resolve(pokemon_query)
+        if pokemon_name is None:
+            text = f"❌ Unknown Pokémon: {pokemon_query}"
+            if suggestions:
+                text += f"\nDid you mean: {', '.join(suggestions)}?"
+            message = await update.message.reply_text(text)
+            # Untuk command salah, hapus langsung
+            deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+            deletions.schedule(update.effective_chat.id, message.message_id, 120)
+            return
         
         # Validasi boosted
         if is_boosted not in ['yes', 'no', 'y', 'n']:
             message = await update.message.reply_text("❌ Boosted must be 'yes' or 'no'!")
             # Untuk command salah, hapus langsung
-            asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-            asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 120))
+            deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+            deletions.schedule(update.effective_chat.id, message.message_id, 120)
             return
         
         # Validasi time
@@ -357,68 +316,42 @@ async def newraid(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if invite_time <= 0 or invite_time > 60:
                 message = await update.message.reply_text("❌ Time must be between 1 and 60 minutes!")
                 # Untuk command salah, hapus langsung
-                asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-                asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 120))
+                deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+                deletions.schedule(update.effective_chat.id, message.message_id, 120)
                 return
                 
         except ValueError:
             message = await update.message.reply_text("❌ Time must be a number!")
             # Untuk command salah, hapus langsung
-            asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-            asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+            deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+            deletions.schedule(update.effective_chat.id, message.message_id, 30)
             return
         
         # Konversi boosted ke boolean
         is_boosted_bool = is_boosted in ['yes', 'y']
         
         raid_id = f"raid_{int(time.time())}_{user.id}"
-        boosted_text = "☀️ BOOSTED" if is_boosted_bool else "⚡ NORMAL"
-        
-        # Simpan raid ke database
-        c.execute("""
-            INSERT INTO raids (raid_id, pokemon_name, is_boosted, invite_time, initiator_id)
-            VALUES (?, ?, ?, ?, ?)
-        """, (raid_id, pokemon_name, is_boosted_bool, invite_time, user.id))
-        
-        # Tambah initiator sebagai peserta
-        c.execute("INSERT INTO participants (raid_id, user_id, status) VALUES (?, ?, ?)",
-                 (raid_id, user.id, "going"))
-        
-        conn.commit()
-        
-        # Dapatkan info user lengkap
-        in_game_name, trainer_code, trainer_level, team_color = user_data
-        
-        # Buat keyboard untuk raid
-        keyboard = [
-            [
-                InlineKeyboardButton("✅ Yes", callback_data=f"join_{raid_id}"),
-                InlineKeyboardButton("❌ No", callback_data=f"leave_{raid_id}"),
-                InlineKeyboardButton("❓ Maybe", callback_data=f"maybe_{raid_id}"),
-                InlineKeyboardButton("👥 +1", callback_data=f"plus1_{raid_id}")
-            ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        log_setup.set_context(raid_id=raid_id)
+        chat_id = update.effective_chat.id
         
-        raid_text = f"""
-**{raid_id}:** {pokemon_name} {boosted_text}
-
-**Initiator:** {in_game_name} (Lvl {trainer_level} {team_color})
-**Trainer Code:** `{trainer_code}`
-**Invites in:** {invite_time} minutes
-**Status:** Organizing - Stay online!
-
-✅ **Going:**
-• {in_game_name} ✅ Lvl {trainer_level} {team_color} - `{trainer_code}`
-
-Use buttons below to join the raid!
-        """
+        # Simpan raid ke database (initiator otomatis jadi peserta)
+        expires_at = await db.create_raid(raid_id, pokemon_name, is_boosted_bool, invite_time, user.id, chat_id)
+        raid = RaidState(raid_id, pokemon_name, is_boosted_bool, invite_time, expires_at, user.id, user_data)
+        raid.chat_id = chat_id
+        raid_cache.add_raid(raid)
+        sweeper.schedule(raid)
+        
+        # Kartu raid dan keyboard dari templates (keyboard di-cache per raid)
+        raid_text, reply_markup = templates.render_raid_card(raid, new=True)
         
         # Kirim pesan raid
         raid_message = await update.message.reply_text(raid_text, reply_markup=reply_markup, parse_mode='Markdown')
+        raid_cache.set_location(raid, raid_message.chat_id, raid_message.message_id)
+        # Lokasi kartu disimpan supaya sweeper bisa menutup kartu walaupun bot sempat restart
+        await db.set_raid_message(raid_id, raid.chat_id, raid.message_id)
         
         # Hapus pesan perintah setelah 2 menit (command benar)
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, update.message.message_id, 2))
+        deletions.schedule(update.effective_chat.id, update.message.message_id, 2)
         
         logger.info(f"Raid created: {raid_id}")
         
@@ -427,184 +360,180 @@ Use buttons below to join the raid!
         try:
             error_msg = await update.message.reply_text("❌ Error creating raid!")
             # Hapus pesan perintah langsung (command error)
-            asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-            asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, error_msg.message_id, 30))
+            deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+            deletions.schedule(update.effective_chat.id, error_msg.message_id, 30)
         except:
             pass
-    finally:
-        if conn:
-            conn.close()
 
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         query = update.callback_query
-        await query.answer()
         
         data = query.data
         user = query.from_user
         
-        if data.startswith(('join_', 'leave_', 'maybe_', 'plus1_')):
+        if data.startswith(('join_', 'leave_', 'maybe_', 'plus1_', 'host_')):
             action, raid_id = data.split('_', 1)
             
-            conn = sqlite3.connect('raids.db')
-            c = conn.cursor()
-            
             # Cek apakah user terdaftar
-            c.execute("SELECT in_game_name, trainer_code, trainer_level, team_color FROM users WHERE user_id = ?", (user.id,))
-            user_data = c.fetchone()
+            user_data = await get_profile(user.id)
             
             if not user_data or not user_data[2]:
-                await query.edit_message_text("❌ Please complete registration first!")
-                conn.close()
+                # Cukup notifikasi ke user ini, kartu raid jangan ditimpa
+                await query.answer("❌ Please complete registration first!", show_alert=True)
                 return
             
-            # Query dengan kolom yang eksplisit
-            c.execute("""
-                SELECT 
-                    r.raid_id, r.pokemon_name, r.is_boosted, r.invite_time, r.created_at,
-                    u.in_game_name, u.trainer_code, u.trainer_level, u.team_color
-                FROM raids r 
-                JOIN users u ON r.initiator_id = u.user_id 
-                WHERE r.raid_id = ?
-            """, (raid_id,))
-            raid_data = c.fetchone()
+            # Raid aktif dilayani dari cache, tanpa query ke DB
+            raid = raid_cache.get(raid_id)
             
-            if not raid_data:
+            if not raid:
+                await query.answer()
                 await query.edit_message_text("❌ Raid not found!")
-                conn.close()
                 return
             
-            # Extract data dengan nama variabel yang jelas
-            (raid_id, pokemon_name, is_boosted, invite_time, created_at,
-             initiator_name, initiator_code, initiator_level, initiator_team) = raid_data
-            
-            # Hapus partisipasi sebelumnya user ini di raid ini
-            c.execute("DELETE FROM participants WHERE raid_id = ? AND user_id = ?", (raid_id, user.id))
-            
-            # Tambah partisipasi baru berdasarkan action
-            status_map = {
-                'join': 'going',
-                'maybe': 'maybe', 
-                'plus1': 'plus1'
-            }
-            
-            if action != 'leave':
-                status = status_map.get(action, 'going')
-                c.execute("INSERT INTO participants (raid_id, user_id, status) VALUES (?, ?, ?)",
-                         (raid_id, user.id, status))
-            
-            # Ambil daftar peserta terbaru
-            c.execute("""
-                SELECT u.in_game_name, u.trainer_code, u.trainer_level, u.team_color, p.status
-                FROM participants p
-                JOIN users u ON p.user_id = u.user_id
-                WHERE p.raid_id = ?
-                ORDER BY p.joined_at
-            """, (raid_id,))
-            
-            participants = c.fetchall()
-            conn.commit()
-            
-            # Format ulang pesan raid
-            going_text = "✅ **Going:**\n"
-            maybe_text = "❓ **Maybe:**\n" 
-            plus1_text = "👥 **+1:**\n"
-            
-            for participant in participants:
-                p_name, p_code, p_level, p_team, p_status = participant
-                emoji = "✅" if p_status == "going" else "❓" if p_status == "maybe" else "👥"
-                participant_line = f"• {p_name} {emoji} Lvl {p_level} {p_team} - `{p_code}`\n"
+            if action == 'host':
+                # Simpan ke DB dulu, state di memori baru diubah kalau raid masih aktif
+                try:
+                    await db.add_raid_host(raid_id, user.id)
+                except sqlite3.Error as e:
+                    # Raid baru saja disapu/diarsipkan (FK gagal): tap tetap harus dijawab
+                    logger.warning(f"Could not save host {user.id} for {raid_id}: {e}")
+                    await query.answer("⌛ This raid has ended!")
+                    return
+                if raid_cache.get(raid_id) is not raid:
+                    # Disapu selagi menunggu DB
+                    await query.answer("⌛ This raid has ended!")
+                    return
+                # Host lobby lanjutan: user yang belum dapat kursi otomatis ikut sebagai going
+                participant = raid.participants.get(user.id)
+                if participant is None or participant.status not in SEATS:
+                    raid_cache.set_participation(raid, user.id, 'going', user_data)
+                lobby_number = raid.lobbies.volunteer(user.id) + 1
+                await query.answer(f"🙋 You're hosting lobby {lobby_number}!")
+            else:
+                # Ganti partisipasi user ini berdasarkan action (leave = hapus saja)
+                status_map = {
+                    'join': 'going',
+                    'maybe': 'maybe', 
+                    'plus1': 'plus1'
+                }
+                status = None if action == 'leave' else status_map.get(action, 'going')
                 
-                if p_status == "going":
-                    going_text += participant_line
-                elif p_status == "maybe":
-                    maybe_text += participant_line
-                elif p_status == "plus1":
-                    plus1_text += participant_line
+                # Update di memori, penulisan ke DB menyusul lewat write-behind;
+                # pembagian lobby ikut di-update di RaidState
+                raid_cache.set_participation(raid, user.id, status, user_data)
+                await query.answer()
             
-            boosted_text = "☀️ BOOSTED" if is_boosted else "⚡ NORMAL"
+            # Lokasi kartu belum diketahui kalau raid di-load ulang setelah restart
+            if raid.message_id is None and query.message:
+                raid_cache.set_location(raid, query.message.chat_id, query.message.message_id)
+                await db.set_raid_message(raid_id, raid.chat_id, raid.message_id)
             
-            raid_text = f"""
-**{raid_id}:** {pokemon_name} {boosted_text}
+            # Edit kartu digabung per raid (maks. 1 edit/detik, selalu state terbaru)
+            card_updater.request(raid)
+        else:
+            await query.answer()
+        
+    except Exception as e:
+        logger.error(f"Error in button handler: {e}")
 
-**Initiator:** {initiator_name} (Lvl {initiator_level} {initiator_team})
-**Trainer Code:** `{initiator_code}`
-**Invites in:** {invite_time} minutes
+# Teks filter /list per pesan, dipakai lagi saat tombol Prev/Next ditekan
+list_filters = {}  # (chat_id, message_id) -> teks filter
+LIST_FILTERS_MAX = 1000
+LIST_DELETE_AFTER = 120
+LIST_USAGE = ("❌ Format: /list [pokemon] [boosted|unboosted] [slots:N] [within:MIN]\n"
+              "Example: /list heatran boosted slots:3 within:15")
 
-{going_text}
-{maybe_text if "❓" in maybe_text else ""}
-{plus1_text if "👥" in plus1_text else ""}
-            """
-            
-            # Buat keyboard baru
-            keyboard = [
-                [
-                    InlineKeyboardButton("✅ Yes", callback_data=f"join_{raid_id}"),
-                    InlineKeyboardButton("❌ No", callback_data=f"leave_{raid_id}"),
-                    InlineKeyboardButton("❓ Maybe", callback_data=f"maybe_{raid_id}"),
-                    InlineKeyboardButton("👥 +1", callback_data=f"plus1_{raid_id}")
-                ]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(raid_text, reply_markup=reply_markup, parse_mode='Markdown')
+async def all_raids() -> RaidCache:
+    """Cache berisi raid semua chat: raid_cache, atau salinan DB bersama kalau di-shard"""
+    if not shards.enabled:
+        return raid_cache
+    await shared_raids.reload(SHARED_RAIDS_MAX_AGE)
+    return shared_raids
+
+async def list_page(chat, filter_text: str, after=None, before=None):
+    """Satu halaman /list dari cache: (teks, keyboard) atau (NO_RAIDS_TEXT, None)"""
+    # Di grup hanya raid grup itu; di chat pribadi semua raid
+    chat_id = chat.id if chat.type in ('group', 'supergroup') else None
+    cache = raid_cache if chat_id is not None else await all_raids()
+    raid_filter = RaidFilter.parse(filter_text, pokedex)
+    matches = raid_filter.matches if filter_text else None
+    raids, has_prev, has_next = cache.raid_page(chat_id, matches, raid_filter.within, after, before,
+                                                limit=templates.LIST_PAGE_SIZE)
+    if not raids and before is not None:
+        # Raid di depan sudah expired/tidak cocok lagi: kembali ke halaman pertama
+        raids, has_prev, has_next = cache.raid_page(chat_id, matches, raid_filter.within,
+                                                    limit=templates.LIST_PAGE_SIZE)
+    if not raids:
+        return templates.NO_RAIDS_TEXT, None
+    return (templates.render_raid_list(raids, time.time(), filter_text),
+            templates.list_keyboard(raids, has_prev, has_next))
+
+async def list_raids(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        # Hanya baca dari cache; raid expired sudah/akan disapu oleh sweeper
+        chat = update.effective_chat
+        filter_text = " ".join(context.args)
+        try:
+            text, keyboard = await list_page(chat, filter_text)
+        except ValueError:
+            message = await update.message.reply_text(LIST_USAGE)
+            # Untuk command salah, hapus langsung
+            deletions.schedule(chat.id, update.message.message_id, 0)
+            deletions.schedule(chat.id, message.message_id, 30)
+            return
         
-        conn.close()
+        message = await update.message.reply_text(text, parse_mode='Markdown', reply_markup=keyboard)
+        if keyboard is not None and filter_text:
+            if len(list_filters) >= LIST_FILTERS_MAX:
+                list_filters.pop(next(iter(list_filters)))
+            list_filters[(chat.id, message.message_id)] = filter_text
+        
+        # Hapus pesan command cepat; daftar dibiarkan cukup lama untuk dibuka per halaman
+        deletions.schedule(chat.id, update.message.message_id, 5)
+        deletions.schedule(chat.id, message.message_id, LIST_DELETE_AFTER)
         
     except Exception as e:
-        logger.error(f"Error in button handler: {e}")
+        logger.error(f"Error in list_raids: {e}")
 
-async def list_raids(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def list_navigation(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Tombol Prev/Next pesan /list: edit pesan yang sama dengan halaman lain"""
     try:
-        # Bersihkan raid yang sudah expired
-        cleanup_expired_raids()
-        
-        conn = sqlite3.connect('raids.db')
-        c = conn.cursor()
-        
-        # Hanya tampilkan raid yang masih aktif
-        c.execute("""
-            SELECT r.raid_id, r.pokemon_name, r.is_boosted, r.invite_time, u.in_game_name,
-                   COUNT(p.id) as participant_count,
-                   datetime(r.created_at, '+' || r.invite_time || ' minutes') as expire_time
-            FROM raids r
-            JOIN users u ON r.initiator_id = u.user_id
-            LEFT JOIN participants p ON r.raid_id = p.raid_id AND p.status = 'going'
-            WHERE datetime(r.created_at, '+' || r.invite_time || ' minutes') > datetime('now')
-            GROUP BY r.raid_id
-            ORDER BY r.created_at DESC
-            LIMIT 10
-        """)
-        
-        raids = c.fetchall()
-        conn.close()
-        
-        if not raids:
-            message = await update.message.reply_text("📭 No active raids found!")
+        query = update.callback_query
+        _, direction, expires_at, raid_id = query.data.split(':', 3)
+        cursor = (int(expires_at), raid_id)
+        message = query.message
+        filter_text = list_filters.get((message.chat_id, message.message_id), "")
+        if direction == 'n':
+            text, keyboard = await list_page(message.chat, filter_text, after=cursor)
         else:
-            raids_text = "🔥 **ACTIVE RAIDS** 🔥\n\n"
-            
-            for raid in raids:
-                raid_id, pokemon_name, is_boosted, invite_time, initiator, count, expire_time = raid
-                boosted_emoji = "☀️" if is_boosted else "⚡"
-                
-                # Hitung sisa waktu
-                expire_datetime = datetime.datetime.strptime(expire_time, '%Y-%m-%d %H:%M:%S')
-                now = datetime.datetime.now()
-                time_left = expire_datetime - now
-                minutes_left = max(0, int(time_left.total_seconds() / 60))
-                
-                raids_text += f"**{raid_id}:** {pokemon_name} {boosted_emoji}\n"
-                raids_text += f"By: {initiator} | ⏰ {minutes_left}min left | 👥 {count} participants\n\n"
-            
-            message = await update.message.reply_text(raids_text, parse_mode='Markdown')
+            text, keyboard = await list_page(message.chat, filter_text, before=cursor)
+        await query.answer()
+        await query.edit_message_text(text, parse_mode='Markdown', reply_markup=keyboard)
         
-        # Hapus pesan setelah 2 menit (command benar)
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, update.message.message_id, 5))
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+    except BadRequest as e:
+        # Tombol ditekan dua kali: halaman sama, tidak ada yang perlu diubah
+        if 'not modified' not in str(e).lower():
+            logger.error(f"Error in list_navigation: {e}")
+    except Exception as e:
+        logger.error(f"Error in list_navigation: {e}")
+
+async def inline_raids(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Inline query: raid aktif yang cocok dengan teks query (Pokémon dan/atau boosted)"""
+    try:
+        query = update.inline_query
+        offset = int(query.offset) if query.offset.isdigit() else 0
+        # Isi ulang salinan DB bersama kalau di-shard (raid_search memakai shared_raids)
+        await all_raids()
+        results, next_offset = raid_search.search(query.query, offset)
+        await query.answer(
+            results,
+            cache_time=INLINE_CACHE_TIME,
+            next_offset=str(next_offset) if next_offset is not None else None,
+        )
         
     except Exception as e:
-        logger.error(f"Error in list_raids: {e}")
+        logger.error(f"Error in inline_raids: {e}")
 
 async def nickname(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
@@ -613,8 +542,8 @@ async def nickname(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "❌ Format: /nickname <in-game name> <trainer code>\nExample: /nickname Ash 1234 5678 9012"
             )
             # Untuk command salah, hapus langsung
-            asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-            asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+            deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+            deletions.schedule(update.effective_chat.id, message.message_id, 30)
         else:
             in_game_name = context.args[0]
             trainer_code = " ".join(context.args[1:])
@@ -622,46 +551,39 @@ async def nickname(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if not re.match(r'^[\d\s]+$', trainer_code):
                 message = await update.message.reply_text("❌ Trainer code must contain only numbers and spaces!")
                 # Untuk command salah, hapus langsung
-                asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-                asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+                deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+                deletions.schedule(update.effective_chat.id, message.message_id, 30)
             else:
                 user = update.effective_user
-                conn = sqlite3.connect('raids.db')
-                c = conn.cursor()
                 
                 try:
-                    c.execute("SELECT * FROM users WHERE user_id = ?", (user.id,))
-                    existing_user = c.fetchone()
+                    created = await db.save_nickname(user.id, user.username or user.first_name,
+                                                     in_game_name, trainer_code)
                     
-                    if existing_user:
-                        c.execute("""
-                            UPDATE users 
-                            SET in_game_name = ?, trainer_code = ?, username = ?
-                            WHERE user_id = ?
-                        """, (in_game_name, trainer_code, user.username or user.first_name, user.id))
-                        response_text = "✅ Profile updated!"
-                    else:
-                        c.execute("""
-                            INSERT INTO users (user_id, username, in_game_name, trainer_code)
-                            VALUES (?, ?, ?, ?)
-                        """, (user.id, user.username or user.first_name, in_game_name, trainer_code))
+                    # Baca ulang profil dari DB lalu update snapshot di raid yang sedang aktif
+                    # (kartunya ikut diperbarui)
+                    profile_cache.invalidate(user.id)
+                    profile = await get_profile(user.id)
+                    for raid in raid_cache.refresh_profile(user.id, profile):
+                        card_updater.request(raid)
+                    
+                    if created:
                         response_text = "✅ Registered! Now use: /gamer <level> <team>"
+                    else:
+                        response_text = "✅ Profile updated!"
                     
-                    conn.commit()
                     message = await update.message.reply_text(response_text)
                     
                     # Untuk command benar, hapus setelah 2 menit
-                    asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, update.message.message_id, 5))
-                    asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+                    deletions.schedule(update.effective_chat.id, update.message.message_id, 5)
+                    deletions.schedule(update.effective_chat.id, message.message_id, 30)
                     
                 except Exception as e:
                     message = await update.message.reply_text("❌ Error saving data!")
                     logger.error(f"Error in nickname: {e}")
                     # Untuk command error, hapus langsung
-                    asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-                    asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
-                finally:
-                    conn.close()
+                    deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+                    deletions.schedule(update.effective_chat.id, message.message_id, 30)
         
     except Exception as e:
         logger.error(f"Error in nickname: {e}")
@@ -671,8 +593,8 @@ async def gamer(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if len(context.args) < 2:
             message = await update.message.reply_text("❌ Format: /gamer <level> <team>\nExample: /gamer 40 Yellow")
             # Untuk command salah, hapus langsung
-            asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-            asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+            deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+            deletions.schedule(update.effective_chat.id, message.message_id, 30)
         else:
             try:
                 trainer_level = int(context.args[0])
@@ -681,45 +603,63 @@ async def gamer(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 if team_color not in ['Red', 'Blue', 'Yellow']:
                     message = await update.message.reply_text("❌ Team must be Red, Blue, or Yellow!")
                     # Untuk command salah, hapus langsung
-                    asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-                    asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+                    deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+                    deletions.schedule(update.effective_chat.id, message.message_id, 30)
                 elif trainer_level < 1 or trainer_level > 50:
                     message = await update.message.reply_text("❌ Level must be 1-50!")
                     # Untuk command salah, hapus langsung
-                    asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-                    asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+                    deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+                    deletions.schedule(update.effective_chat.id, message.message_id, 30)
                 else:
                     user = update.effective_user
-                    conn = sqlite3.connect('raids.db')
-                    c = conn.cursor()
                     
-                    c.execute("SELECT * FROM users WHERE user_id = ?", (user.id,))
-                    if not c.fetchone():
+                    if not await db.save_gamer(user.id, trainer_level, team_color):
                         message = await update.message.reply_text("❌ Register first with /nickname")
                         # Untuk command salah, hapus langsung
-                        asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-                        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 120))
+                        deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+                        deletions.schedule(update.effective_chat.id, message.message_id, 120)
                     else:
-                        c.execute("UPDATE users SET trainer_level = ?, team_color = ? WHERE user_id = ?",
-                                 (trainer_level, team_color, user.id))
-                        conn.commit()
+                        # Baca ulang profil dari DB lalu update snapshot di raid yang sedang aktif
+                        # (kartunya ikut diperbarui)
+                        profile_cache.invalidate(user.id)
+                        profile = await get_profile(user.id)
+                        for raid in raid_cache.refresh_profile(user.id, profile):
+                            card_updater.request(raid)
                         message = await update.message.reply_text(f"✅ Level {trainer_level} {team_color} team set!")
                         
                         # Untuk command benar, hapus setelah 2 menit
-                        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, update.message.message_id, 5))
-                        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
-                    
-                    conn.close()
+                        deletions.schedule(update.effective_chat.id, update.message.message_id, 5)
+                        deletions.schedule(update.effective_chat.id, message.message_id, 30)
                     
             except ValueError:
                 message = await update.message.reply_text("❌ Level must be a number!")
                 # Untuk command salah, hapus langsung
-                asyncio.create_task(delete_message_immediately(context, update.effective_chat.id, update.message.message_id))
-                asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+                deletions.schedule(update.effective_chat.id, update.message.message_id, 0)
+                deletions.schedule(update.effective_chat.id, message.message_id, 30)
         
     except Exception as e:
         logger.error(f"Error in gamer: {e}")
 
+# Anti-spam: dalam WARNING_WINDOW detik tiap user cukup dapat satu peringatan,
+# pesan berikutnya hanya dihapus tanpa balasan baru
+WARNING_WINDOW = 60
+WARNING_DELETE_AFTER = 10
+recent_warnings = {}  # (chat_id, user_id) -> waktu peringatan terakhir (monotonic)
+
+def should_warn(chat_id: int, user_id: int) -> bool:
+    """True kalau user belum diberi peringatan dalam WARNING_WINDOW terakhir"""
+    now = time.monotonic()
+    key = (chat_id, user_id)
+    last = recent_warnings.get(key)
+    if last is not None and now - last < WARNING_WINDOW:
+        return False
+    recent_warnings[key] = now
+    # Buang entry lama supaya dict tidak tumbuh terus
+    if len(recent_warnings) > 1000:
+        for old_key in [k for k, t in recent_warnings.items() if now - t >= WARNING_WINDOW]:
+            del recent_warnings[old_key]
+    return True
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle semua pesan yang bukan command atau command yang salah"""
     try:
@@ -727,51 +667,35 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # Skip jika ini adalah pesan join/leave
             if update.message.new_chat_members or update.message.left_chat_member:
                 return
+            
+            chat_id = update.effective_chat.id
+            user_id = update.effective_user.id if update.effective_user else 0
                 
             # Hapus pesan yang bukan command atau command yang tidak dikenali
             if not update.message.text or not update.message.text.startswith('/'):
-                # Hapus pesan langsung
-                await delete_message_immediately(context, update.effective_chat.id, update.message.message_id)
-                
-                warning_msg = await update.message.reply_text(
-                    "⚠️ **Only raid commands are allowed!**\n\n"
-                    "📋 **Available Commands:**\n"
-                    "• /start - Start bot\n"
-                    "• /help - Show help\n"
-                    "• /nickname <name> <code> - Register\n"
-                    "• /gamer <level> <team> - Set level & team\n"
-                    "• /myprofile - Check profile\n"
-                    "• /newraid <pokemon> <boosted> <time> - Create raid\n"
-                    "• /list - Show active raids\n\n"
-                    "💡 **Example:** /newraid Heatran yes 5"
-                )
-                # Hapus pesan warning setelah 10 detik
-                await asyncio.sleep(10)
-                await warning_msg.delete()
+                try:
+                    if should_warn(chat_id, user_id):
+                        warning_msg = await update.message.reply_text(templates.ONLY_COMMANDS_WARNING)
+                        # Hapus pesan warning setelah 10 detik (tanpa menahan handler)
+                        deletions.schedule(chat_id, warning_msg.message_id, WARNING_DELETE_AFTER)
+                finally:
+                    # Hapus pesan langsung (setelah warning terkirim, karena warning me-reply pesan
+                    # ini), juga kalau warning gagal dikirim
+                    deletions.schedule(chat_id, update.message.message_id, 0)
             else:
                 # Jika itu adalah command yang tidak dikenali, hapus dan beri panduan
                 command = update.message.text.split()[0]
                 known_commands = ['/start', '/help', '/nickname', '/gamer', '/myprofile', '/newraid', '/list', '/myraids', '/adminlist', '/rules', '/raid']
                 
                 if command not in known_commands:
-                    # Hapus pesan command tidak dikenal langsung
-                    await delete_message_immediately(context, update.effective_chat.id, update.message.message_id)
-                    
-                    warning_msg = await update.message.reply_text(
-                        f"❌ **Unknown command: {command}**\n\n"
-                        "📋 **Available Commands:**\n"
-                        "• /start - Start bot\n"
-                        "• /help - Show help\n"
-                        "• /nickname <name> <code> - Register\n"
-                        "• /gamer <level> <team> - Set level & team\n"
-                        "• /myprofile - Check profile\n"
-                        "• /newraid <pokemon> <boosted> <time> - Create raid\n"
-                        "• /list - Show active raids\n\n"
-                        "💡 **Use /help for more info**"
-                    )
-                    # Hapus pesan warning setelah 10 detik
-                    await asyncio.sleep(10)
-                    await warning_msg.delete()
+                    try:
+                        if should_warn(chat_id, user_id):
+                            warning_msg = await update.message.reply_text(templates.unknown_command_warning(command))
+                            # Hapus pesan warning setelah 10 detik (tanpa menahan handler)
+                            deletions.schedule(chat_id, warning_msg.message_id, WARNING_DELETE_AFTER)
+                    finally:
+                        # Hapus pesan command tidak dikenal langsung, juga kalau warning gagal dikirim
+                        deletions.schedule(chat_id, update.message.message_id, 0)
                     
     except Exception as e:
         logger.warning(f"Could not handle message: {e}")
@@ -782,50 +706,210 @@ async def simple_command(update: Update, context: ContextTypes.DEFAULT_TYPE, tex
     try:
         message = await update.message.reply_text(text)
         # Untuk command benar, hapus setelah 2 menit
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, update.message.message_id, 5))
-        asyncio.create_task(delete_message_after_delay(context, update.effective_chat.id, message.message_id, 30))
+        deletions.schedule(update.effective_chat.id, update.message.message_id, 5)
+        deletions.schedule(update.effective_chat.id, message.message_id, 30)
     except Exception as e:
         logger.error(f"Error in simple command: {e}")
 
 async def raid_example(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await simple_command(update, context, """
-🔍 **NEW RAID COMMAND EXAMPLE:**
-
-To start a new raid:
-`/newraid Heatran yes 5`
-
-**Parameters:**
-• **Pokémon**: Name of the raid boss
-• **Boosted**: "yes" or "no" 
-• **Time**: Minutes until invites (5 minutes)
-    """)
+    await simple_command(update, context, templates.RAID_EXAMPLE_TEXT)
 
 async def rules(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await simple_command(update, context, """
-📖 **GROUP RULES**
-
-• Registration is MANDATORY
-• Only raid commands allowed
-• No spam or unrelated messages
-• Be respectful to other trainers
-• Stay online during raids
-    """)
+    await simple_command(update, context, templates.RULES_TEXT)
 
 async def adminlist(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await simple_command(update, context, "🛠️ Contact @admin for assistance")
+    await simple_command(update, context, templates.ADMINLIST_TEXT)
 
 async def my_raids(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await simple_command(update, context, "🎯 Use /list to see active raids you've joined")
+    await simple_command(update, context, templates.MYRAIDS_TEXT)
 
-def main():
-    # Inisialisasi database
-    if not init_db():
-        return
-    
-    cleanup_expired_raids()
-    
-    # Buat application
-    application = Application.builder().token(BOT_TOKEN).build()
+# Resource di bawah ini dibuat sekali per proses dan dipakai ulang setiap kali
+# Application dibuat ulang oleh supervisor (restart tidak perlu init ulang DB/cache)
+
+async def start_services():
+    """Dijalankan sekali di event loop sebelum bot pertama kali start"""
+    # Recovery: isi cache raid dari DB lalu mulai write-behind
+    await raid_cache.load()
+    raid_cache.start()
+    # Raid yang expired selama bot mati langsung disapu begitu bot tersambung
+    sweeper.load()
+    await deletions.load()
+    # DB dipakai bersama semua shard, pemeliharaan cukup dijalankan satu proses
+    if shards.index == 0:
+        maintenance.start()
+
+def attach_bot(bot):
+    """Sambungkan task background ke bot dari Application yang sedang jalan"""
+    deletions.start(bot)
+    card_updater.start(bot)
+    sweeper.start(bot)
+
+async def detach_bot():
+    """Hentikan task yang memakai bot sebelum bot & rate limiter di-shutdown"""
+    await sweeper.stop()
+    await card_updater.stop()
+    # Penghapusan yang belum jalan tetap tersimpan (di heap dan di DB)
+    await deletions.stop()
+
+async def stop_services():
+    """Tulis perubahan yang tersisa sebelum proses selesai"""
+    logger.info(f"Raid card update stats: {card_updater.stats()}")
+    logger.info(f"Deletion stats: {deletions.stats()}")
+    logger.info(f"Expiry sweeper stats: {sweeper.stats()}")
+    logger.info(f"Profile cache stats: {profile_cache.stats()}")
+    logger.info(f"Outbound request stats: {outbound.stats()}")
+    logger.info(f"Maintenance stats: {maintenance.stats()}")
+    logger.info(f"Supervisor stats: {supervisor_stats}")
+    if shards.enabled:
+        logger.info(f"Shard stats: {shards.stats()}")
+    await maintenance.stop()
+    # Jadwal penghapusan yang dibuat setelah scheduler berhenti tetap masuk DB
+    await deletions.flush()
+    try:
+        await raid_cache.stop()
+    except Exception as e:
+        logger.error(f"Error flushing raid cache on shutdown: {e}")
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ringkasan metrics untuk admin (ADMIN_IDS)"""
+    try:
+        chat_id = update.effective_chat.id
+        if update.effective_user.id not in ADMIN_IDS:
+            deletions.schedule(chat_id, update.message.message_id, 0)
+            return
+        
+        api = outbound.stats()
+        lines = ["📊 BOT STATS", ""]
+        lines.extend(metrics.handler_summary() or ["No updates handled yet"])
+        lines += [
+            "",
+            f"DB: {db.queries} queries, {db.query_time * 1000:.0f}ms total",
+            f"API: {sum(api['requests'].values())} requests, queue {api['queue_depth']}, "
+            f"avg wait {api['avg_wait'] * 1000:.0f}ms, {api['retry_after']} RetryAfter",
+            f"Raids: {len(raid_cache.raids)} active, {raid_cache.stats()['pending_writes']} pending writes, "
+            f"{sweeper.swept} swept",
+            f"Deletions: {len(deletions)} pending, {deletions.deleted} deleted",
+            f"Card edits: {card_updater.edits} sent, {card_updater.skipped} skipped",
+            f"Inline: {raid_search.queries} queries, {raid_search.rebuilds} snapshot rebuilds",
+            f"Throttled: {sum(user_limiter.throttled.values())} updates "
+            f"({', '.join(f'{kind} {count}' for kind, count in user_limiter.throttled.items())})",
+            f"Restarts: {supervisor_stats['restarts']}",
+        ]
+        if shards.enabled:
+            lines.append(f"Shard {shards.index}/{shards.count}: {shards.accepted} accepted, "
+                         f"{shards.dropped} dropped")
+        message = await update.message.reply_text("\n".join(lines))
+        
+        deletions.schedule(chat_id, update.message.message_id, 5)
+        deletions.schedule(chat_id, message.message_id, 60)
+        
+    except Exception as e:
+        logger.error(f"Error in stats command: {e}")
+
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """Log error yang lolos dari handler (sebelumnya: 'No error handlers are registered')"""
+    logger.error(f"Unhandled error while processing update: {context.error}", exc_info=context.error)
+
+def parse_args(argv=None):
+    """Konfigurasi mode jalan bot dari argumen CLI (default diambil dari environment)"""
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description="Pokemon Go Raid Bot")
+    parser.add_argument('--mode', choices=['polling', 'webhook', 'router'], default=env('BOT_MODE', 'polling'),
+                        help="polling (default), webhook, atau router (meneruskan webhook ke worker per shard)")
+    parser.add_argument('--api-base-url', default=env('TELEGRAM_API_URL'),
+                        help="Bot API lain, mis. server telegram-bot-api lokal (default api.telegram.org)")
+    # Webhook
+    parser.add_argument('--webhook-url', default=env('WEBHOOK_URL'),
+                        help="URL publik yang didaftarkan ke Telegram, mis. https://bot.example.com/telegram")
+    parser.add_argument('--listen', default=env('WEBHOOK_LISTEN', '127.0.0.1'),
+                        help="Alamat listener HTTP lokal")
+    parser.add_argument('--port', type=int, default=int(env('WEBHOOK_PORT', '8443')))
+    parser.add_argument('--url-path', default=env('WEBHOOK_PATH', 'telegram'))
+    parser.add_argument('--secret-token', default=env('WEBHOOK_SECRET'),
+                        help="Dicek di header X-Telegram-Bot-Api-Secret-Token setiap request")
+    parser.add_argument('--max-connections', type=int, default=int(env('WEBHOOK_MAX_CONNECTIONS', '40')))
+    # Sharding: beberapa worker memakai raids.db yang sama, tiap worker memegang sebagian chat
+    parser.add_argument('--shard-index', type=int, default=int(env('SHARD_INDEX', '0')))
+    parser.add_argument('--shard-count', type=int, default=int(env('SHARD_COUNT', '1')),
+                        help="Jumlah worker; > 1 hanya bisa dengan --mode webhook di belakang router "
+                             "(getUpdates tidak bisa dibagi antar proses: 409 Conflict, dan update "
+                             "milik shard lain yang sudah diambil akan hilang)")
+    parser.add_argument('--shard-targets', default=env('SHARD_TARGETS', ''),
+                        help="Mode router: URL webhook lokal tiap worker sesuai urutan shard, dipisah koma")
+    # Polling & HTTP client
+    parser.add_argument('--poll-timeout', type=int, default=int(env('POLL_TIMEOUT', '30')),
+                        help="Long-poll timeout getUpdates (detik)")
+    parser.add_argument('--read-timeout', type=float, default=float(env('READ_TIMEOUT', '10')),
+                        help="Read timeout request ke Bot API (detik)")
+    parser.add_argument('--connection-pool-size', type=int, default=int(env('CONNECTION_POOL_SIZE', '16')))
+    # Logging
+    parser.add_argument('--log-file', default=env('LOG_FILE', 'bot.log'),
+                        help="File log (string kosong = hanya stdout)")
+    parser.add_argument('--log-level', default=env('LOG_LEVEL', 'INFO'))
+    parser.add_argument('--log-levels', default=env('LOG_LEVELS', ''),
+                        help="Level per logger, mis. 'httpx=WARNING,telegram.ext=DEBUG'")
+    parser.add_argument('--log-json', action='store_true', default=env('LOG_JSON', '') not in ('', '0'),
+                        help="Tulis log sebagai JSON lines (dengan raid_id/user_id/handler)")
+    parser.add_argument('--log-max-mb', type=float, default=float(env('LOG_MAX_MB', '10')),
+                        help="Ukuran file log sebelum di-rotate (MB)")
+    parser.add_argument('--log-backups', type=int, default=int(env('LOG_BACKUPS', '5')),
+                        help="Jumlah file log lama (.gz) yang disimpan")
+    parser.add_argument('--log-rotate-when', default=env('LOG_ROTATE_WHEN'),
+                        help="Rotate per waktu (mis. 'midnight') alih-alih per ukuran")
+    # Metrics
+    parser.add_argument('--metrics-listen', default=env('METRICS_LISTEN', '127.0.0.1'))
+    parser.add_argument('--metrics-port', type=int, default=int(env('METRICS_PORT', '9464')),
+                        help="Port endpoint /metrics (0 = nonaktif)")
+    parser.add_argument('--no-rate-limit', dest='rate_limit', action='store_false',
+                        default=env('RATE_LIMIT', '1') != '0',
+                        help="Matikan rate limit per user (env RATE_LIMIT=0)")
+    # Raid
+    parser.add_argument('--lobby-size', type=int, default=int(env('LOBBY_SIZE', '20')),
+                        help="Kursi per lobby raid (peserta +1 memakai 2 kursi)")
+    # Database
+    parser.add_argument('--history-retention-days', type=float, default=float(env('HISTORY_RETENTION_DAYS', '90')),
+                        help="Umur maksimal raid di history (0 = simpan selamanya)")
+    parser.add_argument('--maintenance-interval', type=float, default=float(env('MAINTENANCE_INTERVAL_HOURS', '6')),
+                        help="Jeda antar pemeliharaan database (jam)")
+    config = parser.parse_args(argv)
+
+    if config.mode == 'webhook' and not config.webhook_url:
+        logger.warning("Webhook mode needs --webhook-url / WEBHOOK_URL, falling back to polling")
+        config.mode = 'polling'
+    config.shard_targets = [url.strip() for url in config.shard_targets.split(',') if url.strip()]
+    if config.mode == 'router' and not config.shard_targets:
+        parser.error("--mode router needs --shard-targets / SHARD_TARGETS")
+    if not 0 <= config.shard_index < config.shard_count:
+        parser.error("--shard-index must be between 0 and --shard-count - 1")
+    if config.shard_count > 1 and config.mode == 'polling':
+        # Dicek setelah fallback webhook -> polling di atas supaya tidak lolos diam-diam
+        parser.error("--shard-count > 1 needs --mode webhook (with --webhook-url) behind a --mode router front")
+    return config
+
+def build_application(config, request=None) -> Application:
+    """Buat Application sesuai config dan daftarkan semua handler.
+
+    request: BaseRequest pengganti HTTP client ke Bot API (mis. API palsu di benchmarks/loadtest.py)
+    """
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        # Update diproses paralel supaya spam/command lambat tidak menahan tombol raid.
+        # Aman karena state bersama (cache, scheduler) hanya diubah tanpa await di tengahnya
+        # dan semua query DB diserialkan di thread DB.
+        .concurrent_updates(CONCURRENT_UPDATES)
+        # Semua request keluar lewat scheduler dengan token bucket & prioritas
+        .rate_limiter(outbound)
+        .get_updates_read_timeout(config.read_timeout)
+    )
+    if request is not None:
+        builder = builder.request(request)
+    else:
+        builder = builder.connection_pool_size(config.connection_pool_size).read_timeout(config.read_timeout)
+    if config.api_base_url:
+        base_url = config.api_base_url.rstrip('/')
+        builder = builder.base_url(f"{base_url}/bot").base_file_url(f"{base_url}/file/bot")
+    application = builder.build()
     
     # Register handlers - HARUS DENGAN URUTAN YANG BENAR
     
@@ -845,9 +929,12 @@ def main():
     application.add_handler(CommandHandler("rules", rules))
     application.add_handler(CommandHandler("adminlist", adminlist))
     application.add_handler(CommandHandler("myraids", my_raids))
+    application.add_handler(CommandHandler("stats", stats_command))
     
     # 3. Button handler
+    application.add_handler(CallbackQueryHandler(list_navigation, pattern=f"^{templates.LIST_CALLBACK_PREFIX}"))
     application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(InlineQueryHandler(inline_raids))
     
     # 4. Message handler untuk mencegah pesan biasa di group - HARUS DITEMPATKAN TERAKHIR
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
@@ -855,24 +942,185 @@ def main():
     # 5. Handler untuk command yang tidak dikenali - HARUS DITEMPATKAN PALING TERAKHIR
     application.add_handler(MessageHandler(filters.TEXT & filters.COMMAND, handle_message))
     
+    application.add_error_handler(error_handler)
+    
+    # Semua handler diukur (latency, error, query DB) dan log di dalamnya membawa
+    # handler/user_id/chat_id/raid_id (untuk output JSON)
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = log_setup.with_context(metrics.instrument(handler.callback))
+    
+    # 0. Gate shard di group paling awal: update chat milik worker lain berhenti di sini,
+    #    lalu rate limit per user sebelum handler mana pun menyentuh DB
+    if shards.enabled:
+        application.add_handler(TypeHandler(Update, shards.gate), group=SHARD_GATE_GROUP)
+    if config.rate_limit:
+        application.add_handler(TypeHandler(Update, user_limiter.gate), group=RATE_LIMIT_GROUP)
+    
+    return application
+
+async def run_bot(config, stop_event: asyncio.Event):
+    """Satu siklus hidup Application; return normal kalau stop_event di-set, raise kalau crash"""
+    application = build_application(config)
+    async with application:  # initialize() ... shutdown()
+        # Task background disambung ke bot baru sebelum update pertama bisa diproses,
+        # supaya edit kartu/penghapusan dari update awal tidak memakai bot lama
+        attach_bot(application.bot)
+        try:
+            await application.start()
+            if config.mode == 'webhook':
+                print(f"🌐 Starting webhook on {config.listen}:{config.port}/{config.url_path}...")
+                await application.updater.start_webhook(
+                    listen=config.listen,
+                    port=config.port,
+                    url_path=config.url_path,
+                    webhook_url=config.webhook_url,
+                    secret_token=config.secret_token,
+                    max_connections=config.max_connections,
+                    allowed_updates=Update.ALL_TYPES,
+                )
+            else:
+                print("🔄 Starting polling...")
+                await application.updater.start_polling(
+                    timeout=config.poll_timeout,
+                    allowed_updates=Update.ALL_TYPES,
+                )
+            print("🚀 Bot is ready!")
+            
+            # Tunggu sinyal stop sambil cek updater masih hidup
+            while not stop_event.is_set():
+                try:
+                    await asyncio.wait_for(stop_event.wait(), HEALTH_CHECK_INTERVAL)
+                except asyncio.TimeoutError:
+                    if not application.updater.running or not application.running:
+                        raise RuntimeError("Updater stopped unexpectedly")
+        finally:
+            if application.updater.running:
+                await application.updater.stop()
+            # stop() menunggu handler yang masih jalan; handler itu masih bisa menjadwalkan
+            # penghapusan/edit kartu, jadi task background baru dilepas sesudahnya
+            if application.running:
+                await application.stop()
+            await detach_bot()
+
+def restart_delay(attempt: int) -> float:
+    """Exponential backoff dengan full jitter: acak antara 0 dan min(max, base * 2^attempt)"""
+    return random.uniform(0, min(RESTART_MAX_DELAY, RESTART_BASE_DELAY * (2 ** attempt)))
+
+async def supervise(config):
+    """Jalankan bot dan restart dengan backoff kalau crash, sampai SIGINT/SIGTERM"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Misalnya di Windows - Ctrl+C tetap jadi KeyboardInterrupt
+            pass
+    
+    await start_services()
+    # Endpoint /metrics hidup sepanjang proses, tidak ikut restart bersama Application
+    metrics_server = metrics.MetricsServer(host=config.metrics_listen, port=config.metrics_port)
+    if config.metrics_port:
+        await metrics_server.start()
+    attempt = 0
+    try:
+        while not stop_event.is_set():
+            started = time.monotonic()
+            try:
+                await run_bot(config, stop_event)
+                break
+            except Exception as e:
+                print(f"❌ Bot crashed: {e}")
+                logger.error(f"Bot crashed: {e}", exc_info=True)
+            
+            # Kalau sempat jalan normal cukup lama, backoff mulai dari awal lagi
+            if time.monotonic() - started > RESTART_RESET_AFTER:
+                attempt = 0
+            delay = restart_delay(attempt)
+            attempt += 1
+            supervisor_stats['restarts'] += 1
+            print(f"🔄 Restarting in {delay:.1f} seconds...")
+            try:
+                await asyncio.wait_for(stop_event.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await metrics_server.stop()
+        await stop_services()
+
+async def run_router(config):
+    """Mode router: terima webhook dan teruskan ke worker pemilik chat sampai SIGINT/SIGTERM"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    router = sharding.ShardRouter(config.shard_targets, host=config.listen, port=config.port,
+                                  url_path=config.url_path)
+    await router.start()
+    print(f"🔀 Routing updates to {len(config.shard_targets)} workers")
+    try:
+        await stop_event.wait()
+    finally:
+        await router.stop()
+        logger.info(f"Router stats: {router.stats()}")
+
+def main(argv=None):
+    config = parse_args(argv)
+    log_listener = log_setup.setup_logging(
+        log_file=config.log_file or None,
+        level=config.log_level,
+        json_lines=config.log_json,
+        max_bytes=int(config.log_max_mb * 1024 * 1024),
+        backup_count=config.log_backups,
+        rotate_when=config.log_rotate_when,
+        logger_levels=log_setup.parse_levels(config.log_levels),
+    )
+    # Log ERROR di dalam handler ikut dihitung sebagai error handler
+    logging.getLogger().addHandler(metrics.ErrorLogCounter())
+    register_metrics()
+    maintenance.retention = config.history_retention_days * 86400 or None
+    maintenance.interval = config.maintenance_interval * 3600
+    shards.index, shards.count = config.shard_index, config.shard_count
+    if shards.enabled:
+        raid_search.raid_cache = shared_raids
+        profile_cache.ttl = min(profile_cache.ttl, SHARDED_PROFILE_TTL)
+    raid_cache.lobby_size = config.lobby_size
+    
+    # Router tidak memakai DB maupun bot, hanya meneruskan update
+    if config.mode == 'router':
+        try:
+            asyncio.run(run_router(config))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            log_listener.stop()
+        return
+    
+    # Inisialisasi database (sekali per proses, dipakai ulang saat restart)
+    if not init_db():
+        log_listener.stop()
+        return
+    
     # Start bot
     print("🤖 Pokemon Go Raid Bot Starting...")
     print("✅ Database initialized")
     print("👋 Welcome message enabled for new members")
     print("⏰ Command timing: Correct=2min, Wrong=Immediate")
-    print("🔄 Starting polling...")
-    print("🚀 Bot is ready!")
+    if shards.enabled:
+        print(f"🧩 Shard {shards.index} of {shards.count}")
     
     try:
-        application.run_polling()
-    except Exception as e:
-        print(f"❌ Bot crashed: {e}")
-        logger.error(f"Bot crashed: {e}")
-        # Restart dalam 10 detik
-        print("🔄 Restarting in 10 seconds...")
-        time.sleep(10)
-        main()
+        asyncio.run(supervise(config))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+        # Tulis sisa log di antrian sebelum proses selesai
+        log_listener.stop()
 
 if __name__ == '__main__':
     main()
-
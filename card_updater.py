@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Set
+
+from telegram.error import BadRequest
+
+from raid_cache import RaidState
+
+logger = logging.getLogger(__name__)
+
+
+class RaidCardUpdater:
+    """Gabungkan edit kartu raid per raid (debounce).
+
+    Tap tombol langsung mengubah state di cache, lalu cukup memanggil
+    request(). Tiap raid punya paling banyak satu task worker yang mengedit
+    pesan maksimal sekali per min_interval detik dan selalu me-render state
+    terbaru, jadi N tap dalam satu detik menjadi sekitar satu edit. Kalau teks
+    hasil render sama dengan yang terakhir dikirim (mis. join lalu leave), edit
+    tidak dikirim sama sekali.
+    """
+
+    def __init__(self, render: Callable[[RaidState], tuple], min_interval: float = 1.0):
+        self.render = render
+        self.min_interval = min_interval
+        self.bot = None
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._dirty: Set[str] = set()
+        self._last_edit: Dict[str, float] = {}
+        # Teks terakhir yang sudah tampil di kartu per raid
+        self._last_text: Dict[str, str] = {}
+        # Statistik: permintaan render, edit yang benar-benar dikirim, edit yang dilewati
+        self.requests = 0
+        self.edits = 0
+        self.skipped = 0
+
+    def start(self, bot):
+        self.bot = bot
+
+    async def stop(self):
+        workers = list(self._workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._dirty.clear()
+
+    def request(self, raid: RaidState):
+        """Tandai kartu raid perlu di-render ulang"""
+        if raid.chat_id is None or raid.message_id is None:
+            return
+        self.requests += 1
+        self._dirty.add(raid.raid_id)
+        if raid.raid_id not in self._workers:
+            self._workers[raid.raid_id] = asyncio.create_task(self._worker(raid))
+
+    def forget(self, raid_id: str):
+        """Raid sudah selesai - buang state debounce-nya"""
+        task = self._workers.pop(raid_id, None)
+        if task is not None:
+            task.cancel()
+        self._dirty.discard(raid_id)
+        self._last_edit.pop(raid_id, None)
+        self._last_text.pop(raid_id, None)
+
+    async def _worker(self, raid: RaidState):
+        raid_id = raid.raid_id
+        try:
+            while raid_id in self._dirty:
+                # Tunggu sampai jeda minimal sejak edit terakhir terpenuhi
+                wait = self._last_edit.get(raid_id, 0) + self.min_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                # Ambil state terbaru tepat sebelum render
+                self._dirty.discard(raid_id)
+                text, reply_markup = self.render(raid)
+                if text == self._last_text.get(raid_id):
+                    self.skipped += 1
+                    continue
+                self._last_edit[raid_id] = time.monotonic()
+                await self._edit(raid, text, reply_markup)
+        finally:
+            if self._workers.get(raid_id) is asyncio.current_task():
+                del self._workers[raid_id]
+
+    async def _edit(self, raid: RaidState, text: str, reply_markup):
+        try:
+            await self.bot.edit_message_text(
+                text, chat_id=raid.chat_id, message_id=raid.message_id,
+                reply_markup=reply_markup, parse_mode='Markdown',
+            )
+            self.edits += 1
+            self._last_text[raid.raid_id] = text
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                self._last_text[raid.raid_id] = text
+            else:
+                logger.warning(f"Could not update raid card {raid.raid_id}: {e}")
+        except Exception as e:
+            logger.warning(f"Could not update raid card {raid.raid_id}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {'requests': self.requests, 'edits': self.edits, 'skipped': self.skipped,
+                'active_workers': len(self._workers)}
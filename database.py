@@ -0,0 +1,349 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from lobbies import SEATS
+from migrations import enable_incremental_vacuum, run_migrations
+
+logger = logging.getLogger(__name__)
+
+
+# Record hasil query - tetap bisa di-unpack seperti tuple biasa
+class UserProfile(NamedTuple):
+    in_game_name: str
+    trainer_code: str
+    trainer_level: Optional[int]
+    team_color: Optional[str]
+
+
+class ParticipantInfo(NamedTuple):
+    in_game_name: str
+    trainer_code: str
+    trainer_level: Optional[int]
+    team_color: Optional[str]
+    status: str
+
+
+class ActiveRaid(NamedTuple):
+    raid_id: str
+    pokemon_name: str
+    is_boosted: bool
+    invite_time: int
+    initiator_name: str
+    participant_count: int
+    expires_at: int
+
+
+# Query disimpan sebagai konstanta supaya statement cache sqlite3 selalu kena
+# (statement yang sama di-prepare sekali lalu dipakai ulang)
+SQL_GET_USER = """
+    SELECT in_game_name, trainer_code, trainer_level, team_color
+    FROM users WHERE user_id = ?
+"""
+SQL_USER_EXISTS = "SELECT 1 FROM users WHERE user_id = ?"
+SQL_UPDATE_NICKNAME = """
+    UPDATE users SET in_game_name = ?, trainer_code = ?, username = ?
+    WHERE user_id = ?
+"""
+SQL_INSERT_USER = """
+    INSERT INTO users (user_id, username, in_game_name, trainer_code)
+    VALUES (?, ?, ?, ?)
+"""
+SQL_UPDATE_GAMER = "UPDATE users SET trainer_level = ?, team_color = ? WHERE user_id = ?"
+SQL_INSERT_RAID = """
+    INSERT INTO raids (raid_id, pokemon_name, is_boosted, invite_time, initiator_id, expires_at, chat_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_INSERT_PARTICIPANT = "INSERT INTO participants (raid_id, user_id, status, chat_id) VALUES (?, ?, ?, ?)"
+SQL_DELETE_PARTICIPANT = "DELETE FROM participants WHERE raid_id = ? AND user_id = ?"
+# Raid bisa saja sudah disapu sweeper sebelum batch write-behind ditulis
+SQL_INSERT_PARTICIPANT_IF_RAID = """
+    INSERT INTO participants (raid_id, user_id, status, chat_id)
+    SELECT raid_id, ?, ?, chat_id FROM raids WHERE raid_id = ?
+"""
+SQL_ADD_RAID_HOST = "INSERT OR IGNORE INTO raid_hosts (raid_id, user_id) VALUES (?, ?)"
+SQL_REMOVE_RAID_HOST = "DELETE FROM raid_hosts WHERE raid_id = ? AND user_id = ?"
+SQL_LOAD_RAID_HOSTS = "SELECT raid_id, user_id FROM raid_hosts ORDER BY volunteered_at"
+SQL_SET_RAID_MESSAGE = "UPDATE raids SET chat_id = ?, message_id = ? WHERE raid_id = ?"
+# Semua raid yang masih ada di tabel (yang sudah expired tapi belum disapu ikut
+# di-load supaya kartunya tetap ditutup oleh sweeper)
+SQL_LOAD_RAIDS = """
+    SELECT r.raid_id, r.pokemon_name, r.is_boosted, r.invite_time, r.expires_at, r.initiator_id,
+           r.chat_id, r.message_id,
+           u.in_game_name, u.trainer_code, u.trainer_level, u.team_color
+    FROM raids r
+    JOIN users u ON r.initiator_id = u.user_id
+    ORDER BY r.id
+"""
+SQL_LOAD_PARTICIPANTS = """
+    SELECT p.raid_id, p.user_id, p.status,
+           u.in_game_name, u.trainer_code, u.trainer_level, u.team_color
+    FROM participants p
+    JOIN users u ON p.user_id = u.user_id
+    ORDER BY p.joined_at, p.id
+"""
+# Arsip per raid_id: setiap proses (shard) hanya mengarsipkan raid milik chat-nya.
+# expires_at dicek lagi supaya raid yang belum expired tidak ikut terhapus.
+SQL_ARCHIVE_EXPIRED_RAID = """
+    INSERT OR REPLACE INTO raid_history
+        (raid_id, pokemon_name, is_boosted, invite_time, initiator_id, chat_id, created_at, expires_at,
+         going, maybe, plus1)
+    SELECT r.raid_id, r.pokemon_name, r.is_boosted, r.invite_time, r.initiator_id, r.chat_id,
+           r.created_at, r.expires_at,
+           COUNT(CASE WHEN p.status = 'going' THEN 1 END),
+           COUNT(CASE WHEN p.status = 'maybe' THEN 1 END),
+           COUNT(CASE WHEN p.status = 'plus1' THEN 1 END)
+    FROM raids r
+    LEFT JOIN participants p ON p.raid_id = r.raid_id
+    WHERE r.raid_id = ? AND r.expires_at <= ?
+    GROUP BY r.raid_id
+"""
+SQL_ARCHIVE_EXPIRED_PARTICIPANTS = """
+    INSERT OR REPLACE INTO participant_history (raid_id, user_id, status)
+    SELECT p.raid_id, p.user_id, p.status
+    FROM participants p
+    JOIN raids r ON r.raid_id = p.raid_id
+    WHERE r.raid_id = ? AND r.expires_at <= ?
+"""
+SQL_DELETE_EXPIRED_PARTICIPANTS = """
+    DELETE FROM participants
+    WHERE raid_id = ? AND EXISTS (SELECT 1 FROM raids WHERE raid_id = ? AND expires_at <= ?)
+"""
+SQL_DELETE_EXPIRED_RAID = "DELETE FROM raids WHERE raid_id = ? AND expires_at <= ?"
+SQL_PURGE_PARTICIPANT_HISTORY = """
+    DELETE FROM participant_history
+    WHERE raid_id IN (SELECT raid_id FROM raid_history WHERE expires_at < ?)
+"""
+SQL_PURGE_RAID_HISTORY = "DELETE FROM raid_history WHERE expires_at < ?"
+SQL_LOAD_PENDING_DELETIONS = "SELECT due_at, chat_id, message_id FROM pending_deletions"
+SQL_SAVE_PENDING_DELETION = """
+    INSERT OR REPLACE INTO pending_deletions (chat_id, message_id, due_at) VALUES (?, ?, ?)
+"""
+SQL_REMOVE_PENDING_DELETION = "DELETE FROM pending_deletions WHERE chat_id = ? AND message_id = ?"
+
+
+class Database:
+    """Satu koneksi SQLite yang dipakai terus, dijalankan di thread DB khusus.
+
+    Semua query lewat satu worker thread sehingga koneksi tidak pernah dipakai
+    bersamaan dan event loop tidak ikut menunggu disk I/O.
+    """
+
+    def __init__(self, path: str = 'raids.db'):
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Statistik: jumlah operasi dan total waktu eksekusi di thread DB
+        self.queries = 0
+        self.query_time = 0.0
+        # Hook opsional on_query(nama_operasi, detik), mis. untuk metrics
+        self.on_query: Optional[Callable[[str, float], None]] = None
+
+    def open(self):
+        """Buka koneksi (idempotent) dan set PRAGMA untuk performa"""
+        if self.conn is not None:
+            return
+        # isolation_level=None: transaksi diatur manual lewat BEGIN/COMMIT
+        self.conn = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=128,
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='raids-db')
+        logger.info(f"Database opened: {self.path}")
+
+    def close(self):
+        if self._executor is not None:
+            # Tunggu query yang masih antri sebelum koneksi ditutup
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.conn is not None:
+            # Perbarui statistik query planner untuk tabel yang banyak berubah
+            try:
+                self.conn.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                logger.warning(f"PRAGMA optimize failed: {e}")
+            self.conn.close()
+            self.conn = None
+            logger.info("Database closed")
+
+    def migrate(self) -> int:
+        """Upgrade skema ke versi terbaru (dipanggil sekali sebelum bot jalan)"""
+        version = run_migrations(self.conn)
+        enable_incremental_vacuum(self.conn)
+        return version
+
+    async def _run(self, func, *args):
+        """Jalankan func(conn, *args) di thread DB"""
+        elapsed = [0.0]
+
+        def timed(conn, *args):
+            start = time.perf_counter()
+            try:
+                return func(conn, *args)
+            finally:
+                elapsed[0] = time.perf_counter() - start
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, timed, self.conn, *args)
+        finally:
+            self.queries += 1
+            self.query_time += elapsed[0]
+            if self.on_query is not None:
+                # Nama operasi = method publik yang memanggil, mis. 'create_raid'
+                target = args[0] if func is Database._in_transaction else func
+                self.on_query(target.__qualname__.split('.<locals>')[0].rsplit('.', 1)[-1], elapsed[0])
+
+    def stats(self) -> dict:
+        return {'queries': self.queries, 'query_time': self.query_time}
+
+    @staticmethod
+    def _in_transaction(conn: sqlite3.Connection, func, *args):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(conn, *args)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    # ---- users ----
+
+    async def get_user(self, user_id: int) -> Optional[UserProfile]:
+        def query(conn, user_id):
+            row = conn.execute(SQL_GET_USER, (user_id,)).fetchone()
+            return UserProfile(*row) if row else None
+        return await self._run(query, user_id)
+
+    async def save_nickname(self, user_id: int, username: str, in_game_name: str, trainer_code: str) -> bool:
+        """Simpan nickname, return True kalau user baru terdaftar"""
+        def write(conn):
+            if conn.execute(SQL_USER_EXISTS, (user_id,)).fetchone():
+                conn.execute(SQL_UPDATE_NICKNAME, (in_game_name, trainer_code, username, user_id))
+                return False
+            conn.execute(SQL_INSERT_USER, (user_id, username, in_game_name, trainer_code))
+            return True
+        return await self._run(self._in_transaction, write)
+
+    async def save_gamer(self, user_id: int, trainer_level: int, team_color: str) -> bool:
+        """Update level & team, return False kalau user belum terdaftar"""
+        def write(conn):
+            return conn.execute(SQL_UPDATE_GAMER, (trainer_level, team_color, user_id)).rowcount > 0
+        return await self._run(self._in_transaction, write)
+
+    # ---- raids ----
+
+    async def create_raid(self, raid_id: str, pokemon_name: str, is_boosted: bool,
+                          invite_time: int, initiator_id: int, chat_id: Optional[int] = None) -> int:
+        """Simpan raid baru di chat_id sekaligus initiator sebagai peserta 'going', return expires_at"""
+        expires_at = int(time.time()) + invite_time * 60
+        def write(conn):
+            conn.execute(SQL_INSERT_RAID, (raid_id, pokemon_name, is_boosted, invite_time, initiator_id,
+                                           expires_at, chat_id))
+            conn.execute(SQL_INSERT_PARTICIPANT, (raid_id, initiator_id, "going", chat_id))
+        await self._run(self._in_transaction, write)
+        return expires_at
+
+    async def set_raid_message(self, raid_id: str, chat_id: int, message_id: int):
+        """Simpan lokasi pesan kartu raid"""
+        def write(conn):
+            conn.execute(SQL_SET_RAID_MESSAGE, (chat_id, message_id, raid_id))
+        await self._run(write)
+
+    async def load_raids(self) -> List[Tuple[tuple, List[tuple], List[int]]]:
+        """Semua raid yang belum disapu beserta pesertanya (urutan join) dan host
+        volunteer (urutan menawarkan diri), untuk isi cache"""
+        def query(conn):
+            raids = {row[0]: (row, [], []) for row in conn.execute(SQL_LOAD_RAIDS)}
+            for raid_id, *participant in conn.execute(SQL_LOAD_PARTICIPANTS):
+                if raid_id in raids:
+                    raids[raid_id][1].append(tuple(participant))
+            for raid_id, user_id in conn.execute(SQL_LOAD_RAID_HOSTS):
+                if raid_id in raids:
+                    raids[raid_id][2].append(user_id)
+            return list(raids.values())
+        return await self._run(query)
+
+    async def archive_expired_raids(self, raid_ids: List[str], now: float) -> int:
+        """Pindahkan raid di raid_ids yang expired sebelum `now` beserta pesertanya ke tabel history.
+
+        Salin + hapus dalam satu transaksi, jadi tabel raids/participants hanya
+        berisi raid yang masih aktif. Return jumlah raid yang diarsipkan.
+        """
+        def write(conn):
+            conn.executemany(SQL_ARCHIVE_EXPIRED_RAID, [(raid_id, now) for raid_id in raid_ids])
+            conn.executemany(SQL_ARCHIVE_EXPIRED_PARTICIPANTS, [(raid_id, now) for raid_id in raid_ids])
+            conn.executemany(SQL_DELETE_EXPIRED_PARTICIPANTS, [(raid_id, raid_id, now) for raid_id in raid_ids])
+            deleted = 0
+            for raid_id in raid_ids:
+                deleted += conn.execute(SQL_DELETE_EXPIRED_RAID, (raid_id, now)).rowcount
+            return deleted
+        return await self._run(self._in_transaction, write)
+
+    # ---- maintenance ----
+
+    async def compact(self, retention: Optional[float]) -> dict:
+        """Buang history yang lebih tua dari `retention` detik (None = simpan semua),
+        kembalikan halaman kosong ke OS lalu perbarui statistik query planner"""
+        def purge(conn):
+            cutoff = time.time() - retention
+            conn.execute(SQL_PURGE_PARTICIPANT_HISTORY, (cutoff,))
+            return conn.execute(SQL_PURGE_RAID_HISTORY, (cutoff,)).rowcount
+
+        def vacuum(conn):
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # incremental_vacuum dan optimize dijalankan di luar transaksi
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+            conn.execute("PRAGMA optimize")
+            return free_pages - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        purged = await self._run(self._in_transaction, purge) if retention else 0
+        freed_pages = await self._run(vacuum)
+        return {'purged_raids': purged, 'freed_pages': freed_pages}
+
+    async def add_raid_host(self, raid_id: str, user_id: int):
+        """Catat user sebagai host volunteer raid ini"""
+        def write(conn):
+            conn.execute(SQL_ADD_RAID_HOST, (raid_id, user_id))
+        await self._run(write)
+
+    # ---- participants ----
+
+    async def apply_participant_changes(self, changes: List[Tuple[str, int, Optional[str]]]):
+        """Tulis batch (raid_id, user_id, status) dalam satu transaksi; status None = keluar.
+        User yang tidak lagi going/+1 juga berhenti jadi host."""
+        def write(conn):
+            for raid_id, user_id, status in changes:
+                conn.execute(SQL_DELETE_PARTICIPANT, (raid_id, user_id))
+                if status is not None:
+                    conn.execute(SQL_INSERT_PARTICIPANT_IF_RAID, (user_id, status, raid_id))
+                if status not in SEATS:
+                    conn.execute(SQL_REMOVE_RAID_HOST, (raid_id, user_id))
+        await self._run(self._in_transaction, write)
+
+    # ---- pending deletions ----
+
+    async def load_pending_deletions(self) -> List[Tuple[float, int, int]]:
+        """Semua penghapusan yang belum dijalankan sebagai (due_at, chat_id, message_id)"""
+        def query(conn):
+            return [tuple(row) for row in conn.execute(SQL_LOAD_PENDING_DELETIONS)]
+        return await self._run(query)
+
+    async def sync_pending_deletions(self, added: List[Tuple[float, int, int]],
+                                     removed: List[Tuple[int, int]]):
+        """Simpan penghapusan baru dan buang yang sudah selesai dalam satu transaksi"""
+        def write(conn):
+            conn.executemany(SQL_SAVE_PENDING_DELETION,
+                             [(chat_id, message_id, due_at) for due_at, chat_id, message_id in added])
+            conn.executemany(SQL_REMOVE_PENDING_DELETION, removed)
+        await self._run(self._in_transaction, write)
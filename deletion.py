@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class DeletionScheduler:
+    """Satu scheduler untuk semua penghapusan pesan terjadwal.
+
+    Setiap penghapusan cukup disimpan sebagai tuple (due_at, chat_id, message_id)
+    di min-heap, lalu satu task background menghapus pesan sesuai urutan waktu.
+    Antrian ikut disimpan di tabel pending_deletions supaya tidak hilang saat
+    bot restart.
+
+    Pesan yang jatuh tempo berdekatan (dalam coalesce_window detik) dihapus
+    bersama: dikelompokkan per chat lalu dikirim lewat deleteMessages, maksimal
+    100 ID per request.
+
+    owns_chat (opsional) membatasi penghapusan yang di-load dari DB ke chat
+    milik proses ini, supaya shard lain tidak menghapus pesan yang sama.
+
+    Jadwal baru ditulis ke DB paling lambat save_delay detik setelah dibuat
+    (digabung per batch), tidak menunggu penghapusan berikutnya jatuh tempo.
+    """
+
+    # Batas Bot API untuk deleteMessages
+    MAX_BULK = 100
+
+    def __init__(self, db: Database, coalesce_window: float = 1.0,
+                 owns_chat: Optional[Callable[[Optional[int]], bool]] = None, save_delay: float = 1.0):
+        self.db = db
+        self.coalesce_window = coalesce_window
+        self.save_delay = save_delay
+        self.owns_chat = owns_chat
+        # Statistik: pesan terhapus, request yang dikirim, dan request yang dihemat
+        self.deleted = 0
+        self.requests_sent = 0
+        self.requests_saved = 0
+        self.bot = None
+        self._heap: List[Tuple[float, int, int]] = []
+        # Perubahan yang belum ditulis ke DB
+        self._unsaved: List[Tuple[float, int, int]] = []
+        # Batas waktu menulis _unsaved ke DB (None = tidak ada yang menunggu)
+        self._save_due: Optional[float] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def load(self):
+        """Ambil penghapusan yang tertunda dari DB (misalnya sebelum restart)"""
+        self._heap = await self.db.load_pending_deletions()
+        if self.owns_chat is not None:
+            self._heap = [record for record in self._heap if self.owns_chat(record[1])]
+        heapq.heapify(self._heap)
+        if self._heap:
+            logger.info(f"Loaded {len(self._heap)} pending message deletions")
+
+    def start(self, bot):
+        self.bot = bot
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Hentikan scheduler; penghapusan yang belum jalan tetap tersimpan di DB"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        """Tulis jadwal yang belum tersimpan ke DB sekarang juga"""
+        await self._sync([])
+
+    def schedule(self, chat_id: int, message_id: int, delay: float = 30):
+        """Jadwalkan penghapusan pesan setelah delay detik (0 = secepatnya)"""
+        now = time.time()
+        record = (now + delay, chat_id, message_id)
+        heapq.heappush(self._heap, record)
+        first_unsaved = not self._unsaved
+        if first_unsaved:
+            self._save_due = now + self.save_delay
+        self._unsaved.append(record)
+        # Bangunkan loop kalau pesan ini jadi yang paling cepat jatuh tempo, atau supaya
+        # loop ikut menunggu batas simpan ke DB (jadwal tidak hilang kalau bot mati)
+        if self._wakeup is not None and (first_unsaved or self._heap[0] is record):
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            due = []
+            # Ambil juga yang jatuh tempo sebentar lagi supaya bisa digabung dalam satu request
+            if self._heap and self._heap[0][0] <= now:
+                horizon = now + self.coalesce_window
+                while self._heap and self._heap[0][0] <= horizon:
+                    due.append(heapq.heappop(self._heap))
+            if due:
+                await self._delete_due(due)
+            if due or (self._save_due is not None and self._save_due <= time.time()):
+                await self._sync(due)
+
+            self._wakeup.clear()
+            deadlines = [self._heap[0][0]] if self._heap else []
+            if self._save_due is not None:
+                deadlines.append(self._save_due)
+            timeout = min(deadlines) - time.time() if deadlines else None
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _delete_due(self, due: List[Tuple[float, int, int]]):
+        by_chat: Dict[int, List[int]] = {}
+        for _, chat_id, message_id in due:
+            by_chat.setdefault(chat_id, []).append(message_id)
+        batches = []
+        for chat_id, message_ids in by_chat.items():
+            message_ids = sorted(set(message_ids))
+            for i in range(0, len(message_ids), self.MAX_BULK):
+                batches.append((chat_id, message_ids[i:i + self.MAX_BULK]))
+        await asyncio.gather(*(self._delete_batch(chat_id, message_ids) for chat_id, message_ids in batches))
+
+    async def _delete_batch(self, chat_id: int, message_ids: List[int]):
+        if len(message_ids) == 1:
+            await self._delete(chat_id, message_ids[0])
+            return
+        try:
+            self.requests_sent += 1
+            await self.bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+            self.deleted += len(message_ids)
+            self.requests_saved += len(message_ids) - 1
+            logger.info(f"Deleted {len(message_ids)} messages in chat {chat_id}")
+        except Exception as e:
+            # Fallback: hapus satu per satu supaya satu pesan bermasalah tidak menggagalkan semuanya
+            logger.warning(f"Bulk delete of {len(message_ids)} messages failed ({e}), deleting one by one")
+            await asyncio.gather(*(self._delete(chat_id, message_id) for message_id in message_ids))
+
+    async def _delete(self, chat_id: int, message_id: int):
+        try:
+            self.requests_sent += 1
+            await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            self.deleted += 1
+            logger.info(f"Deleted message {message_id}")
+        except Exception as e:
+            logger.warning(f"Could not delete message {message_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'pending': len(self._heap),
+            'deleted': self.deleted,
+            'requests_sent': self.requests_sent,
+            'requests_saved': self.requests_saved,
+        }
+
+    async def _sync(self, done: List[Tuple[float, int, int]]):
+        """Tulis penghapusan baru ke DB dan buang yang sudah selesai"""
+        added, self._unsaved = self._unsaved, []
+        self._save_due = None
+        done_keys = {(chat_id, message_id) for _, chat_id, message_id in done}
+        added_keys = {(chat_id, message_id) for _, chat_id, message_id in added}
+        # Yang dijadwalkan dan langsung selesai di putaran yang sama tidak perlu ke DB
+        to_save = [record for record in added if (record[1], record[2]) not in done_keys]
+        to_remove = list(done_keys - added_keys)
+        if not to_save and not to_remove:
+            return
+        try:
+            await self.db.sync_pending_deletions(to_save, to_remove)
+        except Exception as e:
+            logger.error(f"Error saving pending deletions: {e}")
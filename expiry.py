@@ -0,0 +1,134 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import List, Optional, Tuple
+
+import templates
+from card_updater import RaidCardUpdater
+from database import Database
+from raid_cache import RaidCache, RaidState
+
+logger = logging.getLogger(__name__)
+
+
+class ExpirySweeper:
+    """Task background yang menyapu raid expired tepat pada waktunya.
+
+    Waktu expired semua raid disimpan di min-heap (expires_at, raid_id), jadi
+    task cukup tidur sampai raid berikutnya expired. Saat bangun, raid yang
+    sudah lewat waktunya dipindah ke tabel history (raid + peserta dalam satu
+    transaksi), dibuang dari cache, lalu kartunya diedit menjadi "Expired" tanpa tombol.
+    """
+
+    # Jeda sebelum mencoba lagi kalau penghapusan di DB gagal
+    RETRY_DELAY = 5.0
+
+    def __init__(self, db: Database, raid_cache: RaidCache, card_updater: RaidCardUpdater):
+        self.db = db
+        self.raid_cache = raid_cache
+        self.card_updater = card_updater
+        self.bot = None
+        self._heap: List[Tuple[float, str]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Statistik: putaran sapu, raid yang disapu, kartu yang ditutup
+        self.sweeps = 0
+        self.swept = 0
+        self.cards_closed = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def load(self):
+        """Isi heap dari semua raid di cache (setelah RaidCache.load)"""
+        self._heap = [(raid.expires_at, raid.raid_id) for raid in self.raid_cache.raids.values()]
+        heapq.heapify(self._heap)
+
+    def start(self, bot):
+        self.bot = bot
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, raid: RaidState):
+        """Daftarkan raid baru ke heap"""
+        entry = (raid.expires_at, raid.raid_id)
+        heapq.heappush(self._heap, entry)
+        # Bangunkan loop kalau raid ini jadi yang paling cepat expired
+        if self._wakeup is not None and self._heap[0] is entry:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            if self._heap and self._heap[0][0] <= now:
+                await self.sweep(now)
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def sweep(self, now: Optional[float] = None) -> int:
+        """Sapu semua raid yang expired sebelum `now`, return jumlah raid yang diarsipkan"""
+        now = time.time() if now is None else now
+        due: List[RaidState] = []
+        while self._heap and self._heap[0][0] <= now:
+            _, raid_id = heapq.heappop(self._heap)
+            raid = self.raid_cache.get(raid_id)
+            if raid is not None and raid.expires_at <= now:
+                due.append(raid)
+
+        if not due:
+            return 0
+        try:
+            deleted = await self.db.archive_expired_raids([raid.raid_id for raid in due], now)
+        except Exception as e:
+            logger.error(f"Error sweeping expired raids: {e}")
+            for raid in due:
+                heapq.heappush(self._heap, (now + self.RETRY_DELAY, raid.raid_id))
+            return 0
+
+        self.sweeps += 1
+        self.swept += deleted
+        for raid in due:
+            self.raid_cache.remove(raid.raid_id)
+            self.card_updater.forget(raid.raid_id)
+            templates.forget_keyboard(raid.raid_id)
+        if deleted:
+            logger.info(f"Archived {deleted} expired raids")
+        if self.bot is not None:
+            await asyncio.gather(*(self._close_card(raid) for raid in due if raid.message_id is not None))
+        return deleted
+
+    async def _close_card(self, raid: RaidState):
+        try:
+            # Tanpa reply_markup = tombol ikut dihapus
+            await self.bot.edit_message_text(
+                templates.render_expired_text(raid), chat_id=raid.chat_id,
+                message_id=raid.message_id, parse_mode='Markdown',
+            )
+            self.cards_closed += 1
+        except Exception as e:
+            logger.warning(f"Could not close raid card {raid.raid_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'pending': len(self._heap),
+            'sweeps': self.sweeps,
+            'swept': self.swept,
+            'cards_closed': self.cards_closed,
+        }
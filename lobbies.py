@@ -0,0 +1,175 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Ukuran lobby default (pemain per lobby raid, termasuk host); diatur lewat --lobby-size
+LOBBY_SIZE = 20
+
+# Kursi per status: +1 membawa satu teman, maybe belum dapat kursi
+SEATS = {'going': 1, 'plus1': 2}
+
+
+class Lobby:
+    """Satu lobby: host (boleh kosong) dan anggota dalam urutan masuk"""
+    __slots__ = ('host_id', 'members', 'used', 'text')
+
+    def __init__(self, host_id: Optional[int] = None):
+        self.host_id = host_id
+        # user_id -> jumlah kursi (host juga anggota lobby-nya sendiri)
+        self.members: Dict[int, int] = {}
+        self.used = 0
+        # Cache render baris lobby (diisi templates.py, None = perlu render ulang)
+        self.text: Optional[str] = None
+
+
+class LobbyAllocator:
+    """Pembagian peserta going/+1 satu raid ke lobby berukuran tetap.
+
+    Peserta baru masuk ke lobby pertama yang masih muat (first-fit); kalau
+    semua penuh dibuat lobby lanjutan. Saat ada yang keluar, kursi kosong diisi
+    dari lobby terakhir (peserta terbaru dulu), jadi setiap perubahan hanya
+    menyentuh lobby yang terlibat, tanpa membagi ulang semua peserta.
+    Lobby tanpa host bisa diambil trainer yang menekan tombol Host.
+    """
+
+    def __init__(self, size: int = LOBBY_SIZE):
+        # Minimal 2 supaya peserta +1 selalu muat di satu lobby
+        self.size = max(2, size)
+        self.lobbies: List[Lobby] = [Lobby()]
+        self._lobby_of: Dict[int, Lobby] = {}
+        # True kalau ada lobby yang berubah sejak render terakhir
+        self.changed = True
+        # Statistik: peserta yang dipindah antar lobby
+        self.moves = 0
+
+    def __len__(self):
+        return len(self.lobbies)
+
+    def rebuild(self, participants: Iterable[Tuple[int, str]], host_ids: Iterable[int]):
+        """Isi dari peserta (urutan join) lalu pasang host sesuai urutan volunteer (saat load)"""
+        for user_id, status in participants:
+            self.set_status(user_id, status)
+        for user_id in host_ids:
+            if user_id in self._lobby_of:
+                self.volunteer(user_id)
+
+    def open_seats(self) -> int:
+        """Kursi kosong di lobby yang sudah ada (tanpa membuka lobby baru)"""
+        return sum(self.size - lobby.used for lobby in self.lobbies)
+
+    def touch(self, user_id: int):
+        """Baris lobby user ini perlu di-render ulang (mis. profilnya berubah)"""
+        lobby = self._lobby_of.get(user_id)
+        if lobby is not None:
+            self._touch(lobby)
+
+    def set_status(self, user_id: int, status: Optional[str]):
+        """Terapkan status baru user (None = keluar)"""
+        seats = SEATS.get(status, 0)
+        lobby = self._lobby_of.get(user_id)
+        if lobby is None:
+            if seats:
+                self._place(user_id, seats)
+            return
+        old = lobby.members[user_id]
+        if seats == old:
+            return
+        if not seats:
+            self._leave(user_id, lobby)
+        elif seats - old <= self.size - lobby.used or lobby.host_id == user_id:
+            # going <-> +1 tetap di lobby yang sama kalau muat; host selalu tetap di lobby-nya
+            lobby.members[user_id] = seats
+            lobby.used += seats - old
+            self._touch(lobby)
+            if lobby.used > self.size:
+                self._evict(lobby)
+            elif seats < old:
+                self._compact(lobby)
+        else:
+            self._leave(user_id, lobby)
+            self._place(user_id, seats)
+
+    def volunteer(self, user_id: int) -> int:
+        """Jadikan user (yang sudah dapat kursi) host lobby tanpa host pertama,
+        atau host lobby baru kalau semua lobby sudah punya host. Return index lobby."""
+        current = self._lobby_of[user_id]
+        if current.host_id == user_id:
+            return self.lobbies.index(current)
+        target = next((lobby for lobby in self.lobbies if lobby.host_id is None), None)
+        if target is None:
+            target = Lobby()
+            self.lobbies.append(target)
+        target.host_id = user_id
+        if target is not current:
+            seats = current.members.pop(user_id)
+            current.used -= seats
+            target.members[user_id] = seats
+            target.used += seats
+            self._lobby_of[user_id] = target
+            self.moves += 1
+            self._touch(current)
+            if target.used > self.size:
+                self._evict(target)
+            self._compact(current)
+        self._touch(target)
+        return self.lobbies.index(target)
+
+    # ---- internal ----
+
+    def _touch(self, lobby: Lobby):
+        lobby.text = None
+        self.changed = True
+
+    def _add(self, lobby: Lobby, user_id: int, seats: int):
+        lobby.members[user_id] = seats
+        lobby.used += seats
+        self._lobby_of[user_id] = lobby
+        self._touch(lobby)
+
+    def _place(self, user_id: int, seats: int):
+        """First-fit: lobby pertama yang masih muat, atau lobby lanjutan baru"""
+        for lobby in self.lobbies:
+            if self.size - lobby.used >= seats:
+                self._add(lobby, user_id, seats)
+                return
+        lobby = Lobby()
+        self.lobbies.append(lobby)
+        self._add(lobby, user_id, seats)
+
+    def _leave(self, user_id: int, lobby: Lobby):
+        lobby.used -= lobby.members.pop(user_id)
+        del self._lobby_of[user_id]
+        if lobby.host_id == user_id:
+            lobby.host_id = None
+        self._touch(lobby)
+        self._compact(lobby)
+
+    def _evict(self, lobby: Lobby):
+        """Lobby kelebihan kursi: pindahkan anggota terbaru (bukan host) ke lobby lain"""
+        while lobby.used > self.size:
+            user_id = next(uid for uid in reversed(lobby.members) if uid != lobby.host_id)
+            seats = lobby.members.pop(user_id)
+            lobby.used -= seats
+            self.moves += 1
+            self._place(user_id, seats)
+
+    def _compact(self, lobby: Lobby):
+        """Isi kursi kosong di lobby dengan peserta terbaru dari lobby terakhir"""
+        index = self.lobbies.index(lobby)
+        while index < len(self.lobbies) - 1:
+            last = self.lobbies[-1]
+            free = self.size - lobby.used
+            user_id = next((uid for uid in reversed(last.members)
+                            if uid != last.host_id and last.members[uid] <= free), None)
+            if user_id is None:
+                break
+            seats = last.members.pop(user_id)
+            last.used -= seats
+            self._touch(last)
+            self._add(lobby, user_id, seats)
+            self.moves += 1
+            if not last.members and last.host_id is None:
+                self.lobbies.pop()
+        if index and not lobby.members and lobby.host_id is None:
+            # Lobby lanjutan yang kosong dibuang; nomor lobby sesudahnya bergeser
+            del self.lobbies[index]
+            for moved in self.lobbies[index:]:
+                self._touch(moved)
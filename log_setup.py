@@ -0,0 +1,162 @@
+import contextvars
+import functools
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+from typing import Dict, Optional
+
+# Format teks sama dengan basicConfig lama
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Logger pihak ketiga yang terlalu ramai di level INFO (httpx: satu baris per request HTTP)
+DEFAULT_LOGGER_LEVELS = {
+    'httpx': logging.WARNING,
+    'httpcore': logging.WARNING,
+}
+
+# Field konteks yang ikut di setiap baris log selama satu update diproses
+CONTEXT_FIELDS = ('handler', 'user_id', 'chat_id', 'raid_id')
+_context: contextvars.ContextVar[Dict[str, object]] = contextvars.ContextVar('log_context', default={})
+
+
+def set_context(**fields):
+    """Tambah field konteks (mis. raid_id) untuk sisa pemrosesan update ini"""
+    _context.set({**_context.get(), **fields})
+
+
+def with_context(callback):
+    """Bungkus callback handler PTB supaya log di dalamnya membawa handler/user_id/chat_id/raid_id"""
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        fields = {'handler': callback.__name__}
+        user = getattr(update, 'effective_user', None)
+        if user is not None:
+            fields['user_id'] = user.id
+        chat = getattr(update, 'effective_chat', None)
+        if chat is not None:
+            fields['chat_id'] = chat.id
+        query = getattr(update, 'callback_query', None)
+        if query is not None and query.data and '_raid_' in query.data:
+            fields['raid_id'] = query.data.split('_', 1)[1]
+        token = _context.set(fields)
+        try:
+            return await callback(update, context)
+        finally:
+            _context.reset(token)
+    return wrapper
+
+
+class ContextFilter(logging.Filter):
+    """Salin field konteks ke record di thread pemanggil (sebelum masuk antrian)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak memformat di thread pemanggil.
+
+    Bawaan QueueHandler.prepare() menjalankan formatter penuh di thread yang
+    memanggil logger (event loop). Di sini cukup gabungkan msg % args dan
+    traceback-nya; format akhir (teks/JSON) dikerjakan thread listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            # Objek traceback tidak aman dibawa ke thread lain
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Satu objek JSON per baris"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + '.gz'
+
+
+def _gzip_rotator(source: str, dest: str):
+    """File yang di-rotate langsung dikompres (berjalan di thread listener, bukan event loop)"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def parse_levels(spec: Optional[str]) -> Dict[str, int]:
+    """'httpx=WARNING,telegram.ext=DEBUG' -> {'httpx': 30, 'telegram.ext': 10}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def setup_logging(log_file: Optional[str] = 'bot.log', level: str = 'INFO', json_lines: bool = False,
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                  rotate_when: Optional[str] = None,
+                  logger_levels: Optional[Dict[str, int]] = None) -> logging.handlers.QueueListener:
+    """Pasang logging: root logger hanya menaruh record ke antrian, tulis ke
+    stdout/file dikerjakan QueueListener di thread terpisah.
+
+    File di-rotate per ukuran (max_bytes) atau per waktu (rotate_when, mis.
+    'midnight') dan hasil rotate di-gzip; paling banyak backup_count file lama
+    disimpan, jadi pemakaian disk terbatas. Return listener (panggil stop() saat exit).
+    """
+    formatter = JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        if rotate_when:
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                log_file, when=rotate_when, backupCount=backup_count, encoding='utf-8')
+        else:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        file_handler.namer = _gzip_namer
+        file_handler.rotator = _gzip_rotator
+        handlers.append(file_handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    for name, logger_level in {**DEFAULT_LOGGER_LEVELS, **(logger_levels or {})}.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import Optional
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class MaintenanceJob:
+    """Pemeliharaan database berkala: retensi history, incremental VACUUM, PRAGMA optimize.
+
+    Jalan pertama kali initial_delay detik setelah start (supaya tidak bersaing
+    dengan startup), lalu setiap interval detik.
+    """
+
+    def __init__(self, db: Database, interval: float = 6 * 3600, retention: Optional[float] = 90 * 86400,
+                 initial_delay: float = 60):
+        self.db = db
+        self.interval = interval
+        # Umur maksimal baris history dalam detik (None = simpan selamanya)
+        self.retention = retention
+        self.initial_delay = initial_delay
+        self._task: Optional[asyncio.Task] = None
+        # Statistik
+        self.runs = 0
+        self.purged_raids = 0
+        self.freed_pages = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        await asyncio.sleep(self.initial_delay)
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self):
+        try:
+            result = await self.db.compact(self.retention)
+        except Exception as e:
+            logger.error(f"Database maintenance failed: {e}")
+            return
+        self.runs += 1
+        self.purged_raids += result['purged_raids']
+        self.freed_pages += result['freed_pages']
+        logger.info(f"Database maintenance done: {result}")
+
+    def stats(self) -> dict:
+        return {'runs': self.runs, 'purged_raids': self.purged_raids, 'freed_pages': self.freed_pages}
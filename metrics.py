@@ -0,0 +1,278 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import logging
+import math
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bucket latency (detik), dari 1ms sampai 10s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = '') -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Counter yang hanya naik, label diberikan sebagai argumen posisi sesuai labelnames"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Histogram bucket tetap; hitungan per bucket disimpan non-kumulatif, dijumlah saat render"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [hitungan per bucket (+Inf di akhir), sum, count]
+        self.series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self.series.get(labels)
+        return series[2] if series else 0
+
+    def total(self, *labels: str) -> float:
+        series = self.series.get(labels)
+        return series[1] if series else 0.0
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """Perkiraan kuantil = batas atas bucket tempat kuantil itu jatuh"""
+        series = self.series.get(labels)
+        if not series or not series[2]:
+            return None
+        rank = q * series[2]
+        seen = 0
+        for bound, count in zip(self.buckets + (math.inf,), series[0]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class CallbackMetric:
+    """Nilai dibaca saat scrape dari func() - angka, atau dict {labels: nilai}.
+
+    Dipakai untuk membaca counter/antrian yang sudah disimpan komponen lain
+    (stats() scheduler, rate limiter, cache) tanpa menambah kerja di hot path.
+    """
+
+    def __init__(self, name: str, help: str, func: Callable[[], object], kind: str = 'gauge',
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.func = func
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> Iterator[str]:
+        try:
+            value = self.func()
+        except Exception as e:
+            logger.warning(f"Could not collect metric {self.name}: {e}")
+            return
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        if isinstance(value, dict):
+            for labels, item in value.items():
+                labels = labels if isinstance(labels, tuple) else (labels,)
+                yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(item)}"
+        else:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[object] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge_callback(self, name: str, help: str, func: Callable[[], object],
+                       labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self._add(CallbackMetric(name, help, func, 'gauge', labelnames))
+
+    def counter_callback(self, name: str, help: str, func: Callable[[], object],
+                         labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self._add(CallbackMetric(name, help, func, 'counter', labelnames))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Format teks Prometheus (text exposition format 0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Registry bawaan proses + metrik per handler
+REGISTRY = Registry()
+HANDLER_LATENCY = REGISTRY.histogram(
+    'bot_handler_latency_seconds', "Waktu proses update per handler", ('handler',))
+HANDLER_ERRORS = REGISTRY.counter(
+    'bot_handler_errors_total', "Exception atau log ERROR di dalam handler", ('handler',))
+HANDLER_DB_QUERIES = REGISTRY.counter(
+    'bot_handler_db_queries_total', "Query DB yang dijalankan dari dalam handler", ('handler',))
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'bot_db_query_seconds', "Waktu eksekusi query di thread DB per operasi", ('operation',))
+
+# Handler yang sedang memproses update ini (task PTB per update punya context sendiri)
+_current_handler: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('metrics_handler', default=None)
+
+
+def instrument(callback):
+    """Bungkus callback handler PTB: latency, error, dan jumlah query DB per handler"""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        token = _current_handler.set(name)
+        start = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - start, name)
+            _current_handler.reset(token)
+    return wrapper
+
+
+def observe_db_query(operation: str, seconds: float):
+    """Hook untuk Database.on_query"""
+    DB_QUERY_SECONDS.observe(seconds, operation)
+    handler = _current_handler.get()
+    if handler is not None:
+        HANDLER_DB_QUERIES.inc(handler)
+
+
+class ErrorLogCounter(logging.Handler):
+    """Hitung log ERROR yang terjadi di dalam handler (handler bot menangkap exception-nya sendiri)"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+
+    def emit(self, record: logging.LogRecord):
+        handler = _current_handler.get()
+        if handler is not None:
+            HANDLER_ERRORS.inc(handler)
+
+
+def handler_summary() -> List[str]:
+    """Ringkasan per handler untuk /stats"""
+    lines = []
+    for (name,) in sorted(HANDLER_LATENCY.series, key=lambda labels: -HANDLER_LATENCY.count(*labels)):
+        calls = HANDLER_LATENCY.count(name)
+        avg_ms = HANDLER_LATENCY.total(name) / calls * 1000
+        p99 = HANDLER_LATENCY.quantile(0.99, name)
+        p99_text = "∞" if p99 == math.inf else f"{p99 * 1000:g}ms"
+        lines.append(f"{name}: {calls} calls, avg {avg_ms:.1f}ms, p99 ≤{p99_text}, "
+                     f"{HANDLER_DB_QUERIES.get(name) / calls:.1f} db/call, "
+                     f"{HANDLER_ERRORS.get(name):g} errors")
+    return lines
+
+
+class MetricsServer:
+    """Endpoint HTTP lokal minimal: GET /metrics -> teks Prometheus"""
+
+    def __init__(self, registry: Registry = REGISTRY, host: str = '127.0.0.1', port: int = 9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            logger.info(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+        except OSError as e:
+            # Metrics tidak boleh membuat bot gagal start
+            logger.warning(f"Could not start metrics endpoint on {self.host}:{self.port}: {e}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            # Buang header request
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = '200 OK', self.registry.render().encode()
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            else:
+                status, body, content_type = '404 Not Found', b'not found\n', 'text/plain'
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
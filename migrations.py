@@ -0,0 +1,211 @@
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+# Setiap migrasi menerima koneksi dan berjalan di dalam satu transaksi.
+# Versi yang sudah dijalankan dicatat di PRAGMA user_version, jadi database
+# lama (user_version = 0) ikut di-upgrade di tempat saat bot start.
+
+def _create_base_tables(c: sqlite3.Connection):
+    """Skema awal - sama persis dengan tabel lama sehingga aman untuk raids.db yang sudah ada"""
+    # Tabel untuk user terdaftar
+    c.execute('''CREATE TABLE IF NOT EXISTS users
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  user_id INTEGER UNIQUE,
+                  username TEXT,
+                  in_game_name TEXT,
+                  trainer_code TEXT,
+                  trainer_level INTEGER,
+                  team_color TEXT,
+                  registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Tabel untuk raid aktif
+    c.execute('''CREATE TABLE IF NOT EXISTS raids
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  raid_id TEXT UNIQUE,
+                  pokemon_name TEXT,
+                  is_boosted BOOLEAN DEFAULT 0,
+                  invite_time INTEGER DEFAULT 5,
+                  initiator_id INTEGER,
+                  status TEXT DEFAULT 'active',
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Tabel untuk peserta raid
+    c.execute('''CREATE TABLE IF NOT EXISTS participants
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  raid_id TEXT,
+                  user_id INTEGER,
+                  status TEXT,
+                  joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+
+def _add_raid_expiry(c: sqlite3.Connection):
+    """Kolom expires_at (epoch detik, UTC) + index untuk query expired"""
+    c.execute("ALTER TABLE raids ADD COLUMN expires_at INTEGER")
+    # created_at disimpan CURRENT_TIMESTAMP (UTC), jadi strftime('%s') langsung epoch
+    c.execute("""
+        UPDATE raids
+        SET expires_at = CAST(strftime('%s', created_at) AS INTEGER) + invite_time * 60
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_raids_expires_at ON raids (expires_at)")
+
+
+def _rebuild_participants(c: sqlite3.Connection):
+    """Tambah UNIQUE(raid_id, user_id), foreign key dan index di tabel participants.
+
+    SQLite tidak bisa menambah constraint ke tabel yang sudah ada, jadi tabel
+    dibuat ulang. Baris duplikat (ambil yang terbaru) dan baris yatim dari raid
+    yang sudah dihapus dibuang.
+    """
+    c.execute('''CREATE TABLE participants_new
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  raid_id TEXT NOT NULL REFERENCES raids (raid_id) ON DELETE CASCADE,
+                  user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+                  status TEXT,
+                  joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  UNIQUE (raid_id, user_id))''')
+    c.execute("""
+        INSERT INTO participants_new (id, raid_id, user_id, status, joined_at)
+        SELECT p.id, p.raid_id, p.user_id, p.status, p.joined_at
+        FROM participants p
+        WHERE p.id IN (SELECT MAX(id) FROM participants GROUP BY raid_id, user_id)
+          AND EXISTS (SELECT 1 FROM raids r WHERE r.raid_id = p.raid_id)
+          AND EXISTS (SELECT 1 FROM users u WHERE u.user_id = p.user_id)
+    """)
+    dropped = c.execute("SELECT COUNT(*) FROM participants").fetchone()[0] - \
+        c.execute("SELECT COUNT(*) FROM participants_new").fetchone()[0]
+    c.execute("DROP TABLE participants")
+    c.execute("ALTER TABLE participants_new RENAME TO participants")
+    # UNIQUE (raid_id, user_id) sudah jadi index untuk lookup per raid;
+    # index ini untuk daftar peserta yang diurutkan dan lookup per user
+    c.execute("CREATE INDEX IF NOT EXISTS idx_participants_raid_joined ON participants (raid_id, joined_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_participants_user ON participants (user_id)")
+    if dropped:
+        logger.info(f"Dropped {dropped} duplicate/orphan participant rows")
+
+
+def _add_pending_deletions(c: sqlite3.Connection):
+    """Antrian penghapusan pesan supaya tidak hilang saat bot restart"""
+    c.execute('''CREATE TABLE IF NOT EXISTS pending_deletions
+                 (chat_id INTEGER NOT NULL,
+                  message_id INTEGER NOT NULL,
+                  due_at REAL NOT NULL,
+                  PRIMARY KEY (chat_id, message_id)) WITHOUT ROWID''')
+
+
+def _add_raid_message(c: sqlite3.Connection):
+    """Lokasi pesan kartu raid, supaya kartu tetap bisa ditutup setelah bot restart"""
+    c.execute("ALTER TABLE raids ADD COLUMN chat_id INTEGER")
+    c.execute("ALTER TABLE raids ADD COLUMN message_id INTEGER")
+
+
+def _add_history(c: sqlite3.Connection):
+    """Arsip raid yang sudah selesai: satu baris ringkas per raid + status tiap peserta"""
+    c.execute('''CREATE TABLE IF NOT EXISTS raid_history
+                 (raid_id TEXT PRIMARY KEY,
+                  pokemon_name TEXT,
+                  is_boosted BOOLEAN,
+                  invite_time INTEGER,
+                  initiator_id INTEGER,
+                  chat_id INTEGER,
+                  created_at TIMESTAMP,
+                  expires_at INTEGER,
+                  going INTEGER NOT NULL DEFAULT 0,
+                  maybe INTEGER NOT NULL DEFAULT 0,
+                  plus1 INTEGER NOT NULL DEFAULT 0)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_raid_history_expires_at ON raid_history (expires_at)")
+    c.execute('''CREATE TABLE IF NOT EXISTS participant_history
+                 (raid_id TEXT NOT NULL,
+                  user_id INTEGER NOT NULL,
+                  status TEXT,
+                  PRIMARY KEY (raid_id, user_id)) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_participant_history_user ON participant_history (user_id)")
+
+
+def _add_chat_scope(c: sqlite3.Connection):
+    """Raid & peserta dicatat per chat (grup), dengan index untuk query per chat"""
+    c.execute("ALTER TABLE participants ADD COLUMN chat_id INTEGER")
+    c.execute("""
+        UPDATE participants
+        SET chat_id = (SELECT r.chat_id FROM raids r WHERE r.raid_id = participants.raid_id)
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_raids_chat_expires_at ON raids (chat_id, expires_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_participants_chat_user ON participants (chat_id, user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_raid_history_chat ON raid_history (chat_id, expires_at)")
+
+
+def _add_raid_hosts(c: sqlite3.Connection):
+    """Trainer yang menawarkan diri jadi host lobby lanjutan (ikut terhapus bersama raid-nya)"""
+    c.execute('''CREATE TABLE IF NOT EXISTS raid_hosts
+                 (raid_id TEXT NOT NULL REFERENCES raids (raid_id) ON DELETE CASCADE,
+                  user_id INTEGER NOT NULL,
+                  volunteered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  PRIMARY KEY (raid_id, user_id)) WITHOUT ROWID''')
+
+
+# (versi, fungsi) - JANGAN ubah urutan atau isi migrasi yang sudah dirilis,
+# tambahkan migrasi baru di akhir
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _add_raid_expiry),
+    (3, _rebuild_participants),
+    (4, _add_pending_deletions),
+    (5, _add_raid_message),
+    (6, _add_history),
+    (7, _add_chat_scope),
+    (8, _add_raid_hosts),
+]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Jalankan semua migrasi yang belum diterapkan, return versi akhir skema"""
+    current = get_version(conn)
+    pending = [(version, migrate) for version, migrate in MIGRATIONS if version > current]
+    if not pending:
+        return current
+
+    # Foreign key dimatikan selama rebuild tabel, lalu dicek manual sebelum commit
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for version, migrate in pending:
+            conn.execute("BEGIN IMMEDIATE")
+            # Proses lain (shard lain) bisa saja sudah menjalankan migrasi ini selagi menunggu lock
+            if get_version(conn) >= version:
+                conn.execute("ROLLBACK")
+                current = version
+                continue
+            try:
+                migrate(conn)
+                violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+                if violations:
+                    raise sqlite3.IntegrityError(f"Foreign key violations after migration {version}: {violations[:5]}")
+                conn.execute(f"PRAGMA user_version = {version}")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            logger.info(f"Applied database migration {version}: {migrate.__name__}")
+            current = version
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+    return current
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """Ubah auto_vacuum ke INCREMENTAL (sekali saja, butuh VACUUM penuh di luar transaksi).
+
+    Setelah itu halaman kosong bisa dikembalikan ke OS sedikit demi sedikit lewat
+    PRAGMA incremental_vacuum tanpa mengunci database lama-lama.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+    logger.info("Enabled incremental auto_vacuum")
+    return True
@@ -0,0 +1,273 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter, TimedOut
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+# Kelas prioritas: angka kecil dilayani lebih dulu
+PRIORITY_RAID = 0      # edit kartu raid & jawaban tombol
+PRIORITY_REPLY = 1     # balasan command
+PRIORITY_DELETE = 2    # penghapusan pesan (boleh ditunda)
+
+ENDPOINT_PRIORITY = {
+    'editMessageText': PRIORITY_RAID,
+    'editMessageReplyMarkup': PRIORITY_RAID,
+    'answerCallbackQuery': PRIORITY_RAID,
+    'answerInlineQuery': PRIORITY_RAID,
+    'sendMessage': PRIORITY_REPLY,
+    'deleteMessage': PRIORITY_DELETE,
+    'deleteMessages': PRIORITY_DELETE,
+}
+
+# Endpoint yang aman diulang kalau TimedOut (tidak membuat pesan dobel)
+IDEMPOTENT_ENDPOINTS = {
+    'editMessageText', 'editMessageReplyMarkup', 'answerCallbackQuery',
+    'deleteMessage', 'deleteMessages',
+}
+
+# Setiap sekian detik menunggu, request naik satu kelas prioritas (aging), supaya
+# balasan command di grup yang ramai edit raid tidak tertahan selamanya
+AGING_INTERVAL = 10
+
+# Limit per chat Telegram berlaku untuk pesan yang dikirim/diedit, bukan penghapusan
+CHAT_LIMITED_PREFIXES = ('send', 'edit', 'copy', 'forward')
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # Diisi saat Telegram membalas RetryAfter
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float, need: float = 1) -> float:
+        """Detik sampai `need` token tersedia (0 kalau sudah bisa)"""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < need:
+            wait = max(wait, (need - self.tokens) / self.rate)
+        return wait
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class OutboundScheduler(BaseRateLimiter[int]):
+    """Rate limiter untuk semua request keluar (dipasang lewat Application.builder().rate_limiter()).
+
+    - Token bucket global dan per chat (grup 20/menit, private 1/detik)
+    - Request antri berdasarkan prioritas: edit raid > balasan > penghapusan.
+      Penghapusan juga harus menyisakan beberapa token global, jadi saat ramai
+      yang tertunda adalah penghapusan, bukan update raid.
+    - Aging: tiap aging_interval detik menunggu, prioritas request naik satu kelas,
+      jadi edit raid yang terus-menerus tidak membuat balasan di chat yang sama kelaparan
+    - RetryAfter: chat yang kena limit dijeda sesuai retry_after lalu dicoba lagi;
+      kalau request tidak punya limit per chat (penghapusan, jawaban tombol), yang dijeda
+      hanya kelas prioritas request itu, bukan semua request
+    - TimedOut: dicoba lagi hanya untuk endpoint yang idempotent
+
+    rate_limit_args (kalau diisi lewat parameter rate_limit_args di method Bot)
+    mengganti jumlah maksimal retry untuk request itu.
+    """
+
+    def __init__(self, overall_rate: float = 30, overall_burst: float = 30,
+                 group_rate: float = 20 / 60, group_burst: float = 20,
+                 private_rate: float = 1, private_burst: float = 1,
+                 low_priority_reserve: float = 5, max_retries: int = 3,
+                 aging_interval: float = AGING_INTERVAL):
+        self.overall_rate = overall_rate
+        self.overall_burst = overall_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.low_priority_reserve = low_priority_reserve
+        self.max_retries = max_retries
+        self.aging_interval = aging_interval
+
+        self._global = TokenBucket(overall_rate, overall_burst)
+        self._chats: Dict[int, TokenBucket] = {}
+        # Jeda RetryAfter per kelas prioritas untuk request tanpa chat
+        self._priority_blocked_until = [0.0] * (PRIORITY_DELETE + 1)
+        # Antrian: [priority, seq, chat_id, future, enqueued_at], diurutkan saat dispatch
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistik
+        self.requests: Dict[str, int] = {}
+        self.retry_after_count = 0
+        self.timeout_retries = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.granted = 0
+
+    async def initialize(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for entry in self._waiters:
+            if not entry[3].done():
+                entry[3].cancel()
+        self._waiters.clear()
+
+    # ---- antrian ----
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.private_rate, self.private_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _wait_time(self, priority: int, chat_id: Optional[int], now: float) -> float:
+        need = 1 + (self.low_priority_reserve if priority >= PRIORITY_DELETE else 0)
+        wait = self._global.wait_time(now, need)
+        wait = max(wait, self._priority_blocked_until[min(priority, PRIORITY_DELETE)] - now)
+        if chat_id is not None:
+            wait = max(wait, self._chat_bucket(chat_id).wait_time(now))
+        return wait
+
+    async def _acquire(self, priority: int, chat_id: Optional[int]):
+        if self._task is None:
+            await self.initialize()
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), chat_id, future, time.monotonic()]
+        self._waiters.append(entry)
+        self._wakeup.set()
+        await future
+
+    async def _dispatch(self):
+        while True:
+            now = time.monotonic()
+            next_wait = None
+            # Prioritas efektif turun (makin didahulukan) seiring lama menunggu
+            order = sorted(self._waiters, key=lambda e: (e[0] - (now - e[4]) / self.aging_interval, e[1]))
+            for entry in order:
+                priority, _, chat_id, future, enqueued = entry
+                if future.done():
+                    self._waiters.remove(entry)
+                    continue
+                wait = self._wait_time(priority, chat_id, now)
+                if wait <= 0:
+                    self._global.consume(now)
+                    if chat_id is not None:
+                        self._chat_bucket(chat_id).consume(now)
+                    self._waiters.remove(entry)
+                    waited = now - enqueued
+                    self.total_wait += waited
+                    self.max_wait = max(self.max_wait, waited)
+                    self.granted += 1
+                    future.set_result(None)
+                elif next_wait is None or wait < next_wait:
+                    next_wait = wait
+
+            # Bersihkan bucket chat yang sudah penuh lagi supaya dict tidak tumbuh terus
+            if len(self._chats) > 1000:
+                for chat_id in [c for c, b in self._chats.items() if b.idle(now)]:
+                    del self._chats[chat_id]
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), next_wait)
+            except asyncio.TimeoutError:
+                pass
+
+    # ---- BaseRateLimiter ----
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        max_retries = self.max_retries if rate_limit_args is None else rate_limit_args
+        priority = ENDPOINT_PRIORITY.get(endpoint, PRIORITY_REPLY)
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+        chat_id = None
+        if endpoint.startswith(CHAT_LIMITED_PREFIXES):
+            try:
+                chat_id = int(data.get('chat_id'))
+            except (TypeError, ValueError):
+                chat_id = None
+
+        attempt = 0
+        while True:
+            await self._acquire(priority, chat_id)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as exc:
+                self.retry_after_count += 1
+                if attempt >= max_retries:
+                    logger.error(f"{endpoint} still rate limited after {max_retries} retries")
+                    raise
+                # Jeda hanya chat yang kena limit; kalau request tidak punya limit per chat,
+                # jeda kelas prioritasnya saja supaya edit raid tetap jalan
+                blocked_until = time.monotonic() + exc.retry_after + 0.1
+                if chat_id is not None:
+                    bucket = self._chat_bucket(chat_id)
+                    bucket.blocked_until = max(bucket.blocked_until, blocked_until)
+                else:
+                    index = min(priority, PRIORITY_DELETE)
+                    self._priority_blocked_until[index] = max(self._priority_blocked_until[index], blocked_until)
+                logger.info(f"Rate limit hit on {endpoint}, retrying after {exc.retry_after}s")
+            except TimedOut:
+                if endpoint not in IDEMPOTENT_ENDPOINTS or attempt >= max_retries:
+                    raise
+                self.timeout_retries += 1
+                logger.info(f"{endpoint} timed out, retrying")
+            attempt += 1
+
+    def stats(self) -> dict:
+        depth = [0, 0, 0]
+        for entry in self._waiters:
+            depth[min(entry[0], PRIORITY_DELETE)] += 1
+        return {
+            'queue_depth': len(self._waiters),
+            'queue_depth_raid': depth[PRIORITY_RAID],
+            'queue_depth_reply': depth[PRIORITY_REPLY],
+            'queue_depth_delete': depth[PRIORITY_DELETE],
+            'granted': self.granted,
+            'avg_wait': self.total_wait / self.granted if self.granted else 0.0,
+            'max_wait': self.max_wait,
+            'retry_after': self.retry_after_count,
+            'timeout_retries': self.timeout_retries,
+            'requests': dict(self.requests),
+        }
@@ -0,0 +1,254 @@
+import logging
+import os
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Daftar nama bawaan (spesies + bentuk boss raid)
+POKEDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'pokemon.txt')
+
+# Nama bentuk regional: "Alolan Vulpix" juga dikenali sebagai "Alola Vulpix"
+REGION_ALIASES = {'Alolan': 'Alola', 'Galarian': 'Galar', 'Hisuian': 'Hisui', 'Paldean': 'Paldea'}
+
+# Awalan yang boleh ditempel ke nama mana pun ("Shadow Mewtwo")
+SHADOW = 'Shadow'
+
+# Jarak edit terbesar yang diindeks (batas max_distance_for)
+MAX_DISTANCE = 2
+
+# Koreksi otomatis hanya kalau panjang query >= jarak edit * rasio ini
+AUTOCORRECT_RATIO = 5
+# Jumlah saran maksimal untuk query yang tidak dikenali
+SUGGESTIONS = 3
+
+_END = '$'
+
+
+def normalize(name: str) -> str:
+    """Kunci pencarian: huruf kecil tanpa aksen, spasi, dan tanda baca ("Farfetch'd" -> "farfetchd")"""
+    name = name.replace('♀', 'f').replace('♂', 'm')
+    name = unicodedata.normalize('NFKD', name).lower()
+    return ''.join(ch for ch in name if ch.isascii() and ch.isalnum())
+
+
+def max_distance_for(key: str) -> int:
+    """Batas salah ketik yang masih dicocokkan, menurut panjang kunci"""
+    if len(key) <= 2:
+        return 0
+    if len(key) <= 5:
+        return 1
+    return 2
+
+
+def _deletes(key: str, distance: int) -> set:
+    """key beserta semua variannya dengan sampai `distance` huruf dihapus"""
+    variants = {key}
+    frontier = {key}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+
+def levenshtein(a: str, b: str, limit: int) -> int:
+    """Jarak edit a-b; berhenti lebih awal (return limit + 1) kalau sudah pasti melewati limit"""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i]
+        for j, cb in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, previous[j] + 1, previous[j - 1] + (ca != cb)))
+        if min(row) > limit:
+            return limit + 1
+        previous = row
+    return previous[-1]
+
+
+class Pokedex:
+    """Indeks nama Pokémon di memori, dibangun sekali saat start.
+
+    Pencarian persis lewat dict kunci ternormalisasi (O(panjang nama)) dan
+    pelengkapan awalan lewat trie. Saran salah ketik memakai indeks hapusan
+    (gaya SymSpell): setiap kunci didaftarkan bersama semua variannya dengan
+    sampai MAX_DISTANCE huruf dihapus, jadi query cukup membuat varian hapusannya
+    sendiri lalu mengecek jarak edit ke beberapa kandidat yang ketemu, tanpa
+    membandingkan ke seluruh daftar.
+    """
+
+    def __init__(self):
+        # kunci -> nama kanonik (termasuk alias)
+        self._exact: Dict[str, str] = {}
+        # Trie per karakter; node[_END] = nama kanonik
+        self._trie: dict = {}
+        # varian hapusan -> kunci asal
+        self._by_delete: Dict[str, List[str]] = {}
+        self.names: List[str] = []
+        self._species = set()
+        # nama spesies -> nama bentuknya ("Charizard" -> ["Mega Charizard X", ...])
+        self._forms: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_file(cls, path: str = POKEDEX_FILE) -> 'Pokedex':
+        pokedex = cls()
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                name = line.split('#', 1)[0].strip()
+                if name:
+                    pokedex.add(name)
+        logger.info(f"Loaded {len(pokedex)} Pokémon names ({len(pokedex._exact)} keys) from {path}")
+        return pokedex
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize(name) in self._exact
+
+    def add(self, name: str):
+        """Tambah nama kanonik; nama bentuk ("Mega Charizard X") juga didaftarkan dengan
+        urutan kata lain ("Charizard Mega X") dan nama wilayah ("Alola Vulpix")"""
+        if normalize(name) in self._exact:
+            return
+        self.names.append(name)
+        words = name.split()
+        prefix, species, rest = self._split_form(words)
+        if species is None:
+            self._species.add(name)
+            self._insert(name, name)
+            return
+        self._insert(name, name)
+        self._forms.setdefault(species, []).append(name)
+        prefixes = [prefix]
+        if prefix in REGION_ALIASES:
+            prefixes.append(REGION_ALIASES[prefix])
+        for alias_prefix in prefixes:
+            self._insert(' '.join([alias_prefix, species] + rest), name)
+            self._insert(' '.join([species, alias_prefix] + rest), name)
+
+    def _split_form(self, words: List[str]) -> Tuple[Optional[str], Optional[str], List[str]]:
+        """"Dusk Mane Necrozma" -> ("Dusk Mane", "Necrozma", []); nama spesies -> (None, None, [])"""
+        for start in range(1, len(words)):
+            for end in range(len(words), start, -1):
+                species = ' '.join(words[start:end])
+                if species in self._species:
+                    return ' '.join(words[:start]), species, words[end:]
+        return None, None, []
+
+    def _insert(self, alias: str, name: str):
+        key = normalize(alias)
+        if not key or key in self._exact:
+            return
+        self._exact[key] = name
+        node = self._trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[_END] = name
+        for variant in _deletes(key, MAX_DISTANCE):
+            self._by_delete.setdefault(variant, []).append(key)
+
+    def lookup(self, query: str) -> Optional[str]:
+        """Nama kanonik untuk query yang cocok persis (setelah normalisasi), atau None"""
+        return self._exact.get(normalize(query))
+
+    def _fuzzy(self, key: str, max_distance: int) -> Dict[str, int]:
+        """nama kanonik -> jarak edit terkecil dari key, untuk semua nama dalam batas"""
+        max_distance = min(max_distance, MAX_DISTANCE)
+        candidates = set()
+        for variant in _deletes(key, max_distance):
+            candidates.update(self._by_delete.get(variant, ()))
+        found: Dict[str, int] = {}
+        for candidate in candidates:
+            if abs(len(candidate) - len(key)) > max_distance:
+                continue
+            distance = levenshtein(key, candidate, max_distance)
+            name = self._exact[candidate]
+            if distance <= max_distance and distance < found.get(name, max_distance + 1):
+                found[name] = distance
+        return found
+
+    def suggest(self, query: str, max_distance: Optional[int] = None, limit: int = 3) -> List[str]:
+        """Nama terdekat (jarak edit <= max_distance, default menurut panjang query), terdekat dulu"""
+        key = normalize(query)
+        if max_distance is None:
+            max_distance = max_distance_for(key)
+        found = self._fuzzy(key, max_distance)
+        return sorted(found, key=lambda name: (found[name], name))[:limit]
+
+    def resolve(self, query: str) -> Tuple[Optional[str], List[str]]:
+        """(nama kanonik, []) kalau query cocok persis atau jelas salah ketik satu nama;
+        selain itu (None, saran nama).
+
+        Salah ketik hanya dikoreksi otomatis kalau query bukan awalan nama lain ("iron",
+        "tapu" -> saran, bukan "Aron"), nama terdekatnya tunggal, jarak editnya kecil
+        dibanding panjang query (AUTOCORRECT_RATIO; "mew2" tidak jadi "Mew"), dan kata
+        yang tidak ada di nama itu tidak menunjuk ke bentuknya ("Charizard X" -> saran
+        "Mega Charizard X", bukan "Charizard"). Awalan Shadow hanya boleh satu."""
+        return self._resolve(query, allow_shadow=True)
+
+    def _resolve(self, query: str, allow_shadow: bool) -> Tuple[Optional[str], List[str]]:
+        name = self.lookup(query)
+        if name is not None:
+            return name, []
+        words = query.split()
+        if allow_shadow and len(words) > 1 and normalize(words[0]) == normalize(SHADOW):
+            name, suggestions = self._resolve(' '.join(words[1:]), allow_shadow=False)
+            if name is not None:
+                return f"{SHADOW} {name}", []
+            return None, [f"{SHADOW} {suggestion}" for suggestion in suggestions]
+        key = normalize(query)
+        completions = self.complete(key, SUGGESTIONS)
+        found = self._fuzzy(key, max_distance_for(key))
+        ranked = sorted(found, key=lambda name: (found[name], name))
+        forms = []
+        if (not completions and ranked and found[ranked[0]] * AUTOCORRECT_RATIO <= len(key)
+                and (len(ranked) == 1 or found[ranked[0]] < found[ranked[1]])):
+            forms = self._forms_named(ranked[0], words)
+            if not forms:
+                return ranked[0], []
+        suggestions = forms + completions + [name for name in ranked if name not in completions + forms]
+        return None, suggestions[:SUGGESTIONS]
+
+    def _forms_named(self, name: str, words: List[str]) -> List[str]:
+        """Bentuk dari spesies `name` yang memuat kata query yang tidak ada di `name`
+        ("Charizard X" -> ["Mega Charizard X"])"""
+        extra = {normalize(word) for word in words} - {normalize(word) for word in name.split()}
+        return [form for form in self._forms.get(name, ())
+                if extra & {normalize(word) for word in form.split()}]
+
+    def matching(self, query: str, limit: int = 50) -> Set[str]:
+        """Nama kanonik yang dimaksud query filter: nama persis, kalau tidak semua nama
+        berawalan query ("iron" -> semua Iron ...), kalau tidak hasil/saran resolve()"""
+        name = self.lookup(query)
+        if name is not None:
+            return {name}
+        completions = self.complete(query, limit)
+        if completions:
+            return set(completions)
+        name, suggestions = self.resolve(query)
+        return {name} if name is not None else set(suggestions)
+
+    @staticmethod
+    def species_of(name: str) -> str:
+        """Nama tanpa awalan Shadow ("Shadow Mewtwo" -> "Mewtwo")"""
+        prefix = SHADOW + ' '
+        return name[len(prefix):] if name.startswith(prefix) else name
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Nama kanonik yang kuncinya diawali prefix (urut abjad)"""
+        node = self._trie
+        for ch in normalize(prefix):
+            node = node.get(ch)
+            if node is None:
+                return []
+        found = []
+        stack = [node]
+        while stack and len(found) < limit:
+            node = stack.pop()
+            name = node.get(_END)
+            if name is not None and name not in found:
+                found.append(name)
+            stack.extend(node[ch] for ch in sorted((ch for ch in node if ch != _END), reverse=True))
+        return found
+
+    def stats(self) -> dict:
+        return {'names': len(self.names), 'keys': len(self._exact)}
@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from database import UserProfile
+
+
+class ProfileCache:
+    """LRU + TTL cache untuk profil trainer yang sudah terdaftar.
+
+    Diisi saat pertama kali dibutuhkan (lazy) dan dibuang (invalidate) oleh
+    /nickname dan /gamer, jadi TTL hanya jaring pengaman kalau DB diubah dari
+    luar proses ini - termasuk shard lain, karena itu TTL dipersingkat kalau bot
+    di-shard. Profil yang belum lengkap (belum /gamer) tidak disimpan: registrasi
+    lewat shard lain harus langsung terlihat dari DB.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 900):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, user_id: int) -> Optional[UserProfile]:
+        entry = self._data.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, profile = entry
+        if expires < time.monotonic():
+            del self._data[user_id]
+            self.misses += 1
+            return None
+        self._data.move_to_end(user_id)
+        self.hits += 1
+        return profile
+
+    def put(self, user_id: int, profile: UserProfile):
+        if any(field is None for field in profile):
+            self._data.pop(user_id, None)
+            return
+        self._data[user_id] = (time.monotonic() + self.ttl, profile)
+        self._data.move_to_end(user_id)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        """Buang profil user (dipanggil setelah profilnya diubah di DB)"""
+        self._data.pop(user_id, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import ActiveRaid, Database, ParticipantInfo, UserProfile
+from lobbies import LOBBY_SIZE, LobbyAllocator
+
+logger = logging.getLogger(__name__)
+
+
+class Participant:
+    """Satu peserta raid (record ringkas, pakai __slots__ tanpa __dict__)"""
+    __slots__ = ('user_id', 'status', 'in_game_name', 'trainer_code', 'trainer_level', 'team_color')
+
+    def __init__(self, user_id: int, status: str, profile: UserProfile):
+        self.user_id = user_id
+        self.status = status
+        self.in_game_name, self.trainer_code, self.trainer_level, self.team_color = profile
+
+    def as_info(self) -> ParticipantInfo:
+        return ParticipantInfo(self.in_game_name, self.trainer_code, self.trainer_level,
+                               self.team_color, self.status)
+
+
+def _discard(keys: List[Tuple[int, str]], key: Tuple[int, str]):
+    """Buang key dari list terurut (kalau ada)"""
+    i = bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+class RaidState:
+    """Raid aktif beserta peserta; urutan dict peserta = urutan join"""
+    __slots__ = ('raid_id', 'pokemon_name', 'is_boosted', 'invite_time', 'expires_at',
+                 'initiator_id', 'initiator', 'participants', 'chat_id', 'message_id',
+                 'changes', 'card', 'lobbies')
+
+    def __init__(self, raid_id: str, pokemon_name: str, is_boosted: bool, invite_time: int,
+                 expires_at: int, initiator_id: int, initiator: UserProfile):
+        self.raid_id = raid_id
+        self.pokemon_name = pokemon_name
+        self.is_boosted = bool(is_boosted)
+        self.invite_time = invite_time
+        self.expires_at = expires_at
+        self.initiator_id = initiator_id
+        self.initiator = initiator
+        self.participants: Dict[int, Participant] = {}
+        # Lokasi pesan kartu raid (diisi setelah kartu terkirim / dari callback)
+        self.chat_id: Optional[int] = None
+        self.message_id: Optional[int] = None
+        # Peserta yang berubah sejak render terakhir: user_id -> True kalau pindah ke
+        # akhir daftar (join/ganti status/keluar), False kalau hanya profilnya berubah
+        self.changes: Dict[int, bool] = {}
+        # Cache render kartu (diisi dan dikelola oleh templates.py)
+        self.card = None
+        # Pembagian peserta ke lobby (diisi RaidCache; None = tanpa pembagian lobby)
+        self.lobbies: Optional[LobbyAllocator] = None
+
+    def set_status(self, user_id: int, status: Optional[str], profile: UserProfile):
+        """Ganti status user (None = keluar); user yang ganti status pindah ke akhir daftar"""
+        # Hapus dulu supaya urutannya sama seperti DELETE+INSERT di DB
+        self.participants.pop(user_id, None)
+        if status is not None:
+            self.participants[user_id] = Participant(user_id, status, profile)
+        # Pindahkan ke akhir: RaidCard.update memutar ulang perubahan sesuai urutan dict ini
+        self.changes.pop(user_id, None)
+        self.changes[user_id] = True
+        if self.lobbies is not None:
+            self.lobbies.set_status(user_id, status)
+
+    def refresh(self, user_id: int, profile: UserProfile) -> bool:
+        """Perbarui snapshot profil user di raid ini, return True kalau user ada di raid"""
+        found = False
+        if self.initiator_id == user_id:
+            self.initiator = profile
+            found = True
+        participant = self.participants.get(user_id)
+        if participant is not None:
+            (participant.in_game_name, participant.trainer_code,
+             participant.trainer_level, participant.team_color) = profile
+            found = True
+        if found:
+            self.changes.setdefault(user_id, False)
+            if self.lobbies is not None:
+                self.lobbies.touch(user_id)
+        return found
+
+    def participant_list(self) -> List[ParticipantInfo]:
+        return [p.as_info() for p in self.participants.values()]
+
+    def count(self, status: str) -> int:
+        return sum(1 for p in self.participants.values() if p.status == status)
+
+
+class RaidCache:
+    """Cache raid aktif di memori dengan write-behind ke database.
+
+    Tombol dan /list dilayani dari memori. Perubahan peserta dikumpulkan lalu
+    ditulis ke raids.db dalam satu transaksi per batch oleh task background.
+
+    owns_chat (opsional) membatasi raid yang di-load ke chat milik proses ini
+    (lihat sharding.ShardMap); raid juga diindeks per chat untuk /list.
+
+    Instance tanpa owns_chat yang tidak di-start bisa dipakai sebagai salinan baca
+    semua chat, diisi ulang dari DB bersama lewat reload().
+    """
+
+    def __init__(self, db: Database, flush_interval: float = 0.5,
+                 owns_chat: Optional[Callable[[Optional[int]], bool]] = None, lobby_size: int = LOBBY_SIZE):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.owns_chat = owns_chat
+        self.lobby_size = lobby_size
+        self.raids: Dict[str, RaidState] = {}
+        # chat_id -> raid di chat itu (urutan dibuat)
+        self.by_chat: Dict[Optional[int], Dict[str, RaidState]] = {}
+        # Kunci (expires_at, raid_id) terurut, semua raid dan per chat (keyset pagination /list)
+        self._expiry_all: List[Tuple[int, str]] = []
+        self._expiry_by_chat: Dict[Optional[int], List[Tuple[int, str]]] = {}
+        # Naik setiap ada raid/peserta yang berubah (snapshot turunan tahu kapan harus dibangun ulang)
+        self.version = 0
+        # Waktu load() terakhir (monotonic), untuk reload()
+        self.loaded_at: Optional[float] = None
+        # (raid_id, user_id) -> status terbaru (None = keluar); urutan = urutan perubahan
+        self._pending: Dict[Tuple[str, int], Optional[str]] = {}
+        self._dirty: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self):
+        """Isi ulang cache dari database (recovery saat startup)"""
+        # Baca dulu baru kosongkan, supaya pembaca tidak pernah melihat cache setengah terisi
+        rows = await self.db.load_raids()
+        self.raids.clear()
+        self.by_chat.clear()
+        self._expiry_all.clear()
+        self._expiry_by_chat.clear()
+        for raid_row, participant_rows, host_ids in rows:
+            (raid_id, pokemon_name, is_boosted, invite_time, expires_at, initiator_id,
+             chat_id, message_id, *initiator) = raid_row
+            if self.owns_chat is not None and not self.owns_chat(chat_id):
+                continue
+            raid = RaidState(raid_id, pokemon_name, is_boosted, invite_time, expires_at,
+                             initiator_id, UserProfile(*initiator))
+            raid.chat_id, raid.message_id = chat_id, message_id
+            for user_id, status, *profile in participant_rows:
+                raid.participants[user_id] = Participant(user_id, status, UserProfile(*profile))
+            self._attach_lobbies(raid, [initiator_id] + host_ids)
+            self._index(raid)
+        self.version += 1
+        self.loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(self.raids)} raids into cache")
+
+    async def reload(self, max_age: float):
+        """load() lagi kalau isi cache sudah lebih tua dari max_age detik"""
+        now = time.monotonic()
+        if self.loaded_at is not None and now - self.loaded_at < max_age:
+            return
+        # Tandai lebih dulu supaya pemanggil lain tidak ikut load bersamaan
+        self.loaded_at = now
+        await self.load()
+
+    def start(self):
+        if self._task is None:
+            self._dirty = asyncio.Event()
+            if self._pending:
+                self._dirty.set()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Hentikan task background lalu tulis semua perubahan yang tersisa"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    # ---- operasi di memori ----
+
+    def get(self, raid_id: str) -> Optional[RaidState]:
+        return self.raids.get(raid_id)
+
+    def add_raid(self, raid: RaidState):
+        """Raid baru (sudah tersimpan di DB oleh create_raid)"""
+        raid.participants[raid.initiator_id] = Participant(raid.initiator_id, "going", raid.initiator)
+        self._attach_lobbies(raid, [raid.initiator_id])
+        self._index(raid)
+
+    def _attach_lobbies(self, raid: RaidState, host_ids: List[int]):
+        """Bagi peserta raid ke lobby; initiator jadi host lobby pertama"""
+        raid.lobbies = LobbyAllocator(self.lobby_size)
+        raid.lobbies.rebuild(((p.user_id, p.status) for p in raid.participants.values()), host_ids)
+
+    def _index(self, raid: RaidState):
+        self.version += 1
+        self.raids[raid.raid_id] = raid
+        self.by_chat.setdefault(raid.chat_id, {})[raid.raid_id] = raid
+        key = (raid.expires_at, raid.raid_id)
+        insort(self._expiry_all, key)
+        insort(self._expiry_by_chat.setdefault(raid.chat_id, []), key)
+
+    def _unindex(self, raid: RaidState):
+        self.version += 1
+        chat_raids = self.by_chat.get(raid.chat_id)
+        if chat_raids is not None:
+            chat_raids.pop(raid.raid_id, None)
+            if not chat_raids:
+                del self.by_chat[raid.chat_id]
+        key = (raid.expires_at, raid.raid_id)
+        _discard(self._expiry_all, key)
+        chat_keys = self._expiry_by_chat.get(raid.chat_id)
+        if chat_keys is not None:
+            _discard(chat_keys, key)
+            if not chat_keys:
+                del self._expiry_by_chat[raid.chat_id]
+
+    def set_location(self, raid: RaidState, chat_id: int, message_id: int):
+        """Catat lokasi kartu raid (chat bisa baru diketahui untuk raid lama tanpa chat_id)"""
+        if raid.chat_id != chat_id:
+            self._unindex(raid)
+            raid.chat_id = chat_id
+            self._index(raid)
+        raid.message_id = message_id
+        self.version += 1
+
+    def set_participation(self, raid: RaidState, user_id: int, status: Optional[str], profile: UserProfile):
+        """Ganti status user di raid (None = keluar) dan antrikan penulisan ke DB"""
+        raid.set_status(user_id, status, profile)
+        self.version += 1
+
+        key = (raid.raid_id, user_id)
+        self._pending.pop(key, None)
+        self._pending[key] = status
+        if self._dirty is not None:
+            self._dirty.set()
+
+    def refresh_profile(self, user_id: int, profile: UserProfile) -> List[RaidState]:
+        """Perbarui snapshot profil user di semua raid aktif (setelah /nickname atau /gamer).
+
+        Return raid yang memuat user ini (kartunya perlu di-render ulang).
+        """
+        refreshed = [raid for raid in self.raids.values() if raid.refresh(user_id, profile)]
+        if refreshed:
+            self.version += 1
+        return refreshed
+
+    def raid_page(self, chat_id: Optional[int] = None, matches: Optional[Callable[[RaidState], bool]] = None,
+                  within: Optional[float] = None, after: Optional[Tuple[int, str]] = None,
+                  before: Optional[Tuple[int, str]] = None, limit: int = 10) -> Tuple[List[ActiveRaid], bool, bool]:
+        """Satu halaman raid aktif di chat_id (None = semua chat), urut (expires_at, raid_id).
+
+        Keyset pagination: after/before = kunci (expires_at, raid_id) raid terakhir/pertama
+        halaman sebelumnya, dicari dengan bisect, jadi halaman ke-20 sama murahnya dengan
+        halaman pertama. within = hanya raid yang expired dalam sekian detik.
+        Return (raid, ada halaman sebelumnya, ada halaman berikutnya).
+        """
+        now = time.time()
+        keys = self._expiry_all if chat_id is None else self._expiry_by_chat.get(chat_id, [])
+        # Raid expired yang belum disapu sweeper selalu di awal urutan
+        low = bisect_right(keys, (now, '\uffff'))
+        high = len(keys) if within is None else bisect_right(keys, (now + within, '\uffff'))
+
+        def collect(indexes) -> List[RaidState]:
+            found = []
+            for i in indexes:
+                raid = self.raids[keys[i][1]]
+                if matches is None or matches(raid):
+                    found.append(raid)
+                    if len(found) > limit:
+                        break
+            return found
+
+        if before is not None:
+            end = max(low, min(high, bisect_left(keys, before)))
+            found = collect(range(end - 1, low - 1, -1))
+            has_prev, has_next = len(found) > limit, end < high
+            page = found[:limit][::-1]
+        else:
+            start = low if after is None else max(low, bisect_right(keys, after))
+            found = collect(range(start, high))
+            has_prev, has_next = start > low, len(found) > limit
+            page = found[:limit]
+        return [ActiveRaid(raid.raid_id, raid.pokemon_name, raid.is_boosted, raid.invite_time,
+                           raid.initiator.in_game_name, raid.count('going'), raid.expires_at)
+                for raid in page], has_prev, has_next
+
+    def remove(self, raid_id: str) -> Optional[RaidState]:
+        """Buang raid dari memori (sudah dihapus dari DB oleh sweeper)"""
+        raid = self.raids.pop(raid_id, None)
+        if raid is not None:
+            self._unindex(raid)
+        return raid
+
+    def stats(self) -> dict:
+        return {'raids': len(self.raids), 'chats': len(self.by_chat), 'pending_writes': len(self._pending)}
+
+    # ---- write-behind ----
+
+    async def flush(self):
+        """Tulis semua perubahan yang masih antri dalam satu transaksi"""
+        if not self._pending:
+            return
+        batch = [(raid_id, user_id, status) for (raid_id, user_id), status in self._pending.items()]
+        self._pending = {}
+        try:
+            await self.db.apply_participant_changes(batch)
+        except Exception as e:
+            logger.error(f"Error flushing {len(batch)} participant changes: {e}")
+            # Kembalikan ke antrian tanpa menimpa perubahan yang lebih baru
+            retry = {(raid_id, user_id): status for raid_id, user_id, status in batch}
+            retry.update(self._pending)
+            self._pending = retry
+            raise
+
+    async def _flush_loop(self):
+        while True:
+            await self._dirty.wait()
+            # Tunggu sebentar supaya tap yang berdekatan masuk satu batch
+            await asyncio.sleep(self.flush_interval)
+            self._dirty.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Sudah di-log di flush(); coba lagi di putaran berikutnya
+                self._dirty.set()
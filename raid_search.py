@@ -0,0 +1,168 @@
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from telegram import (InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle,
+                      InputTextMessageContent)
+
+from pokedex import Pokedex, normalize
+from raid_cache import RaidCache, RaidState
+
+logger = logging.getLogger(__name__)
+
+# Kata filter raid boosted / tidak boosted
+BOOSTED_WORDS = {'boosted', 'boost', 'weather', 'yes', 'y'}
+UNBOOSTED_WORDS = {'unboosted', 'notboosted', 'no', 'n'}
+# Opsi filter berangka: slots:N (kursi kosong minimal), within:N (expired dalam N menit)
+SLOTS_OPTIONS = {'slots', 'open'}
+WITHIN_OPTIONS = {'within', 'expires'}
+
+# Batas Telegram: maksimal 50 hasil per jawaban inline query
+INLINE_PAGE_SIZE = 50
+# Query berbeda yang hasil filternya disimpan per snapshot
+MEMO_SIZE = 256
+
+
+class RaidFilter:
+    """Filter raid dari teks query ("heatran boosted slots:3 within:15")"""
+    __slots__ = ('names', 'boosted', 'min_slots', 'within')
+
+    def __init__(self, names: Optional[Set[str]] = None, boosted: Optional[bool] = None,
+                 min_slots: int = 0, within: Optional[float] = None):
+        # None = semua Pokémon
+        self.names = names
+        # None = boosted maupun tidak
+        self.boosted = boosted
+        # Minimal kursi kosong di lobby yang sudah ada
+        self.min_slots = min_slots
+        # Hanya raid yang expired dalam sekian detik (None = semua)
+        self.within = within
+
+    @classmethod
+    def parse(cls, text: str, pokedex: Pokedex) -> 'RaidFilter':
+        """Kata boosted/unboosted, slots:N, within:N (menit); sisanya nama Pokémon.
+        ValueError kalau angka slots/within tidak valid."""
+        raid_filter = cls()
+        words = []
+        for word in text.split():
+            option, _, value = word.lower().partition(':')
+            key = normalize(word)
+            if value and option in SLOTS_OPTIONS:
+                raid_filter.min_slots = _positive_int(value)
+            elif value and option in WITHIN_OPTIONS:
+                raid_filter.within = _positive_int(value) * 60
+            elif key in BOOSTED_WORDS:
+                raid_filter.boosted = True
+            elif key in UNBOOSTED_WORDS:
+                raid_filter.boosted = False
+            else:
+                words.append(word)
+        if words:
+            raid_filter.names = pokedex.matching(' '.join(words))
+        return raid_filter
+
+    def matches(self, raid: RaidState) -> bool:
+        if self.boosted is not None and raid.is_boosted != self.boosted:
+            return False
+        if self.within is not None and raid.expires_at > time.time() + self.within:
+            return False
+        if self.min_slots and raid.lobbies is not None and raid.lobbies.open_seats() < self.min_slots:
+            return False
+        if self.names is not None and raid.pokemon_name not in self.names:
+            return Pokedex.species_of(raid.pokemon_name) in self.names
+        return True
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise ValueError(f"Expected a positive number, got {value}")
+    return number
+
+
+def raid_link(raid: RaidState) -> Optional[str]:
+    """Link t.me ke kartu raid (hanya bisa untuk supergroup)"""
+    chat = str(raid.chat_id)
+    if raid.message_id is None or not chat.startswith('-100'):
+        return None
+    return f"https://t.me/c/{chat[4:]}/{raid.message_id}"
+
+
+def _raid_result(raid: RaidState, now: float) -> InlineQueryResultArticle:
+    boosted_emoji = "☀️" if raid.is_boosted else "⚡"
+    minutes_left = max(0, int((raid.expires_at - now) / 60))
+    going = raid.count('going')
+    description = f"By: {raid.initiator.in_game_name} | ⏰ {minutes_left}min left | 👥 {going} participants"
+    link = raid_link(raid)
+    return InlineQueryResultArticle(
+        id=raid.raid_id,
+        title=f"{raid.pokemon_name} {boosted_emoji}",
+        description=description,
+        input_message_content=InputTextMessageContent(
+            f"🔥 {raid.pokemon_name} {boosted_emoji}\n{description}"
+        ),
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("➡️ Open raid", url=link)]]) if link else None,
+    )
+
+
+class InlineRaidSearch:
+    """Jawaban inline query (@bot heatran) dari snapshot raid aktif yang sudah di-render.
+
+    Snapshot (satu InlineQueryResultArticle per raid, terbaru dulu) hanya dibangun
+    ulang kalau RaidCache.version berubah atau menit sisa waktu berganti; hasil
+    filter per query disimpan sampai snapshot berikutnya. Menjawab inline query
+    jadi murni baca memori, tanpa DB dan tanpa pesan di grup.
+
+    Kalau bot di-shard, inline query dilayani shard milik user (tanpa chat), yang
+    cache-nya hanya berisi chat miliknya; raid_cache lalu diisi salinan baca semua
+    chat dari DB bersama (RaidCache.reload) supaya hasilnya tetap lengkap.
+    """
+
+    def __init__(self, raid_cache: RaidCache, pokedex: Pokedex):
+        self.raid_cache = raid_cache
+        self.pokedex = pokedex
+        self._key: Optional[Tuple[int, int]] = None
+        self._entries: List[Tuple[RaidState, InlineQueryResultArticle]] = []
+        self._memo: Dict[str, List[InlineQueryResultArticle]] = {}
+        # Statistik
+        self.queries = 0
+        self.rebuilds = 0
+        self.memo_hits = 0
+
+    def _snapshot(self) -> List[Tuple[RaidState, InlineQueryResultArticle]]:
+        now = time.time()
+        key = (self.raid_cache.version, int(now // 60))
+        if key != self._key:
+            self._entries = [(raid, _raid_result(raid, now))
+                             for raid in reversed(self.raid_cache.raids.values()) if raid.expires_at > now]
+            self._memo = {}
+            self._key = key
+            self.rebuilds += 1
+        return self._entries
+
+    def search(self, text: str, offset: int = 0) -> Tuple[List[InlineQueryResultArticle], Optional[int]]:
+        """(hasil untuk satu halaman, offset halaman berikutnya atau None)"""
+        self.queries += 1
+        entries = self._snapshot()
+        memo_key = ' '.join(text.lower().split())
+        results = self._memo.get(memo_key)
+        if results is None:
+            if memo_key:
+                try:
+                    raid_filter = RaidFilter.parse(text, self.pokedex)
+                    results = [result for raid, result in entries if raid_filter.matches(raid)]
+                except ValueError:
+                    results = []
+            else:
+                results = [result for _, result in entries]
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[memo_key] = results
+        else:
+            self.memo_hits += 1
+        end = offset + INLINE_PAGE_SIZE
+        return results[offset:end], (end if end < len(results) else None)
+
+    def stats(self) -> dict:
+        return {'queries': self.queries, 'rebuilds': self.rebuilds, 'memo_hits': self.memo_hits,
+                'snapshot': len(self._entries)}
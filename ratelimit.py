@@ -0,0 +1,111 @@
+import logging
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+logger = logging.getLogger(__name__)
+
+# Batas default per user per jenis update: (jumlah, jendela dalam detik)
+DEFAULT_LIMITS = {
+    'tap': (10, 10),       # tombol raid / halaman /list
+    'command': (6, 20),    # /newraid, /list, ...
+    'message': (5, 10),    # teks biasa (tetap dihapus walau di-throttle)
+    'inline': (20, 10),    # inline query terkirim sambil mengetik
+}
+THROTTLED_TOAST = "⏳ Slow down! Try again in a few seconds."
+
+# Counter user yang sudah diam selama ini dibuang
+PRUNE_INTERVAL = 60
+
+
+def update_kind(update: Update) -> Optional[str]:
+    """Jenis update untuk rate limit, None = tidak dibatasi (mis. member join/leave)"""
+    if update.callback_query is not None:
+        return 'tap'
+    if update.inline_query is not None:
+        return 'inline'
+    message = update.message
+    if message is None or message.text is None:
+        return None
+    return 'command' if message.text.startswith('/') else 'message'
+
+
+class UserRateLimiter:
+    """Rate limit per user dengan sliding window counter, dipasang sebagai TypeHandler
+    di group awal (sebelum semua handler lain).
+
+    Per (user, jenis) hanya disimpan tiga angka: nomor jendela sekarang, hitungan
+    jendela sebelumnya dan jendela sekarang. Perkiraan jumlah dalam jendela geser =
+    sebelumnya * bagian jendela lama yang masih tercakup + sekarang. Update yang
+    melewati batas dihentikan sebelum menyentuh DB: callback dijawab toast singkat,
+    command/pesan di grup langsung dijadwalkan hapus lewat drop_message, sisanya dibuang.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, float]]] = None,
+                 exempt: Optional[Set[int]] = None,
+                 drop_message: Optional[Callable[[int, int], None]] = None):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.exempt = exempt if exempt is not None else set()
+        self.drop_message = drop_message
+        # (user_id, jenis) -> [nomor jendela, hitungan sebelumnya, hitungan sekarang]
+        self._counters: Dict[Tuple[int, str], list] = {}
+        self._last_prune = time.monotonic()
+        # Statistik
+        self.allowed = 0
+        self.throttled: Dict[str, int] = {kind: 0 for kind in self.limits}
+
+    def hit(self, user_id: int, kind: str, now: Optional[float] = None) -> bool:
+        """Catat satu update; False kalau user sudah melewati batas (update tidak dihitung)"""
+        limit, window = self.limits[kind]
+        if now is None:
+            now = time.monotonic()
+        current = int(now // window)
+        counter = self._counters.get((user_id, kind))
+        if counter is None:
+            counter = self._counters[(user_id, kind)] = [current, 0, 0]
+        elif counter[0] != current:
+            # Geser jendela: jendela sekarang jadi sebelumnya (atau kosong kalau sudah lewat lebih jauh)
+            counter[1] = counter[2] if counter[0] == current - 1 else 0
+            counter[2] = 0
+            counter[0] = current
+        elapsed = now / window - current
+        if counter[1] * (1 - elapsed) + counter[2] >= limit:
+            return False
+        counter[2] += 1
+        return True
+
+    def _prune(self, now: float):
+        """Buang counter yang jendelanya sudah tidak ikut dihitung"""
+        stale = [key for key, (window_index, _, _) in self._counters.items()
+                 if window_index < int(now // self.limits[key[1]][1]) - 1]
+        for key in stale:
+            del self._counters[key]
+        self._last_prune = now
+
+    async def gate(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """TypeHandler: hentikan update user yang melewati batas"""
+        kind = update_kind(update)
+        user = update.effective_user
+        if kind is None or kind not in self.limits or user is None or user.id in self.exempt:
+            return
+        now = time.monotonic()
+        if now - self._last_prune > PRUNE_INTERVAL:
+            self._prune(now)
+        if self.hit(user.id, kind, now):
+            self.allowed += 1
+            return
+
+        self.throttled[kind] += 1
+        try:
+            if kind == 'tap':
+                await update.callback_query.answer(THROTTLED_TOAST)
+            elif kind != 'inline' and self.drop_message is not None and update.effective_chat.type != 'private':
+                self.drop_message(update.effective_chat.id, update.message.message_id)
+        except Exception as e:
+            logger.warning(f"Could not answer throttled update from user {user.id}: {e}")
+        raise ApplicationHandlerStop
+
+    def stats(self) -> dict:
+        return {'allowed': self.allowed, 'throttled': dict(self.throttled), 'tracked': len(self._counters)}
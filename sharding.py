@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import zlib
+from typing import Dict, List, Optional
+
+import httpx
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(key: Optional[int], count: int) -> int:
+    """Shard pemilik chat (atau user, untuk update tanpa chat); key None -> shard 0.
+
+    crc32 dipakai karena stabil antar proses (hash() Python di-acak per proses)
+    dan menyebar rata walaupun ID grup berurutan.
+    """
+    if key is None or count <= 1:
+        return 0
+    return zlib.crc32(str(key).encode()) % count
+
+
+def update_key(update: Update) -> Optional[int]:
+    """Kunci sharding sebuah update: chat-nya, atau user kalau tidak ada chat (mis. inline query)"""
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return None
+
+
+def update_key_json(data: dict) -> Optional[int]:
+    """Sama dengan update_key, tapi dari JSON mentah webhook (tanpa membuat objek Update)"""
+    for field, payload in data.items():
+        if field == 'update_id' or not isinstance(payload, dict):
+            continue
+        chat = payload.get('chat') or (payload.get('message') or {}).get('chat')
+        if chat:
+            return chat.get('id')
+        user = payload.get('from') or payload.get('user')
+        if user:
+            return user.get('id')
+    return None
+
+
+class ShardMap:
+    """Pembagian chat ke beberapa proses bot yang memakai DB yang sama.
+
+    Proses ke-index dari count hanya melayani chat dengan shard_of(chat_id) == index:
+    update chat lain dibuang oleh gate() sebelum sampai ke handler, dan cache
+    raid, sweeper serta penghapusan pesan hanya memuat chat miliknya.
+    Karena update yang dibuang gate() tidak dikirim ulang ke worker lain, count > 1
+    hanya valid untuk worker mode webhook di belakang ShardRouter, bukan polling.
+    """
+
+    def __init__(self, index: int = 0, count: int = 1):
+        self.index = index
+        self.count = count
+        # Statistik
+        self.accepted = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.count > 1
+
+    def owns_chat(self, chat_id: Optional[int]) -> bool:
+        return shard_of(chat_id, self.count) == self.index
+
+    async def gate(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """TypeHandler di group paling awal: hentikan update milik shard lain"""
+        if self.owns_chat(update_key(update)):
+            self.accepted += 1
+            return
+        self.dropped += 1
+        raise ApplicationHandlerStop
+
+    def stats(self) -> dict:
+        return {'index': self.index, 'count': self.count, 'accepted': self.accepted, 'dropped': self.dropped}
+
+
+class ShardRouter:
+    """Penerima webhook di depan beberapa worker (bot_fix.py --mode router).
+
+    Telegram hanya mengirim update ke satu URL webhook per bot. Router menerima
+    semua POST di url_path lalu meneruskan body apa adanya (beserta header secret
+    token) ke worker pemilik chat; status balasan worker dikembalikan ke Telegram,
+    jadi kalau worker sedang mati Telegram mengirim ulang update itu nanti.
+    Worker dijalankan dalam mode webhook dengan --webhook-url yang sama (URL publik
+    router) dan --port masing-masing.
+    """
+
+    def __init__(self, targets: List[str], host: str = '127.0.0.1', port: int = 8443,
+                 url_path: str = 'telegram', timeout: float = 10):
+        self.targets = targets
+        self.host = host
+        self.port = port
+        self.url_path = '/' + url_path.strip('/')
+        self.timeout = timeout
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        # Statistik: update diteruskan per shard dan yang gagal diteruskan
+        self.forwarded: Dict[int, int] = {}
+        self.failed = 0
+
+    async def start(self):
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Shard router on {self.host}:{self.port}{self.url_path} -> {len(self.targets)} workers")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _forward(self, body: bytes, headers: Dict[str, str]) -> int:
+        try:
+            key = update_key_json(json.loads(body))
+        except ValueError:
+            return 400
+        shard = shard_of(key, len(self.targets))
+        forward_headers = {'Content-Type': 'application/json'}
+        secret = headers.get('x-telegram-bot-api-secret-token')
+        if secret is not None:
+            forward_headers['X-Telegram-Bot-Api-Secret-Token'] = secret
+        try:
+            response = await self._client.post(self.targets[shard], content=body, headers=forward_headers)
+        except httpx.HTTPError as e:
+            self.failed += 1
+            logger.warning(f"Could not forward update to shard {shard}: {e}")
+            return 502
+        self.forwarded[shard] = self.forwarded.get(shard, 0) + 1
+        return response.status_code
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.timeout)
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'POST' and parts[1].split('?')[0] == self.url_path:
+                body = await asyncio.wait_for(
+                    reader.readexactly(int(headers.get('content-length', 0))), self.timeout)
+                status = await self._forward(body, headers)
+            else:
+                status = 404
+            writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                         f"Content-Length: 0\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def stats(self) -> dict:
+        return {'forwarded': dict(self.forwarded), 'failed': self.failed}
@@ -0,0 +1,360 @@
+from typing import Dict, List, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+
+from database import ActiveRaid
+from lobbies import Lobby
+from raid_cache import Participant, RaidState
+
+
+# Semua teks statis dibuat sekali saat modul di-import. Teks dengan satu bagian
+# dinamis disimpan sebagai (prefix, suffix) supaya render cukup satu penggabungan string.
+
+_WELCOME_MEMBER_HEAD = "👋 **Welcome "
+_WELCOME_MEMBER_TAIL = """ to Pokémon Go Remote Raids!** 👋
+
+☀️🔥☁️ **REMOTE RAIDS INVITES** ☀️🔥☁️
+
+📝 **REGISTRATION IS MANDATORY**
+
+‼️ **To get started, register first:**
+➡️ `/nickname <your in-game name> <trainer code>`
+➡️ `/gamer <Trainer level> <team colour>`
+
+💡 **Example:**
+`/nickname AshKetchum 1234 5678 9012`
+`/gamer 40 Yellow`
+
+🎯 **CREATE RAID:**
+`/newraid <Pokémon> <boosted> <time>`
+💡 **Example:** `/newraid Heatran yes 5`
+
+📋 **OTHER COMMANDS:**
+• `/help` - Show all commands
+• `/myprofile` - Check your registration
+• `/list` - Show active raids
+
+🚫 **RULES:**
+• Only raid commands allowed
+• Registration required before raiding
+• Stay online during raids
+• No spam or unrelated messages
+
+Happy raiding! 🎉"""
+
+START_TEXT = """☀️🔥☁️ WELCOME TO REMOTE RAIDS INVITES ☀️🔥☁️
+
+This is a global Group for Raid Invites, please follow the points below⬇️
+
+✅ Please use this bot to coordinate raids
+
+❗️ Use /help to see how to register📋
+❗️ Use /raid to see an example of what the command should look like🔍
+❗️ Use /rules to check the rules📖
+❗️✅ Share your code ONLY after the raid has been organised✅❗️
+
+📝 **REGISTRATION IS MANDATORY**
+
+‼️ To register use:
+➡️ Format: /nickname <your in-game name> <trainer code>
+⭕️ E.g.: /nickname MyInGameName 1234 5678 9012
+
+➡️ Format: /gamer <Trainer level> <team colour>
+⭕️ E.g.: /gamer 40 Yellow
+
+Type /help to get started!"""
+
+HELP_TEXT = """🆘 **HOW TO USE THE BOT** 🆘
+
+📋 **REGISTRATION (MANDATORY):**
+• Use `/nickname <in-game name> <trainer code>` - Register your basic info
+• Use `/gamer <level> <team color>` - Register your level and team
+• Use `/myprofile` - Check your registration status
+
+🎯 **RAID COMMANDS:**
+• Use `/newraid <Pokémon> <boosted> <time>` - Create new raid
+• Use `/list [Pokémon] [boosted] [slots:N] [within:MIN]` - See active raids
+• Use `/myraids` - See your joined raids
+• Tap 🙋 Host on a full raid to host the next lobby
+• Type the bot's @username and a Pokémon (e.g. `heatran boosted`) in any chat to search raids
+
+🔍 **RAID FORMAT EXAMPLE:**
+`/newraid Heatran yes 5`
+
+📖 **Important Rules:**
+• Registration is mandatory
+• Writing for anything other than creating raid & registering is not allowed
+• Share your Trainer code ONLY during registration
+• Don't enroll into more than one raid at a time
+• Stay active and online in game during raid
+• English only in this group
+• No spoofing promotion
+
+Use /adminlist for any help"""
+
+NOT_REGISTERED_TEXT = """❌ **You are not registered!**
+
+📝 **REGISTRATION IS MANDATORY**
+
+‼️ To register use:
+➡️ /nickname <in-game name> <trainer code>
+➡️ /gamer <level> <team color>
+
+💡 **Example:**
+/nickname Ash 1234 5678 9012
+/gamer 40 Yellow"""
+
+RAID_EXAMPLE_TEXT = """🔍 **NEW RAID COMMAND EXAMPLE:**
+
+To start a new raid:
+`/newraid Heatran yes 5`
+
+**Parameters:**
+• **Pokémon**: Name of the raid boss
+• **Boosted**: "yes" or "no"
+• **Time**: Minutes until invites (5 minutes)"""
+
+RULES_TEXT = """📖 **GROUP RULES**
+
+• Registration is MANDATORY
+• Only raid commands allowed
+• No spam or unrelated messages
+• Be respectful to other trainers
+• Stay online during raids"""
+
+ADMINLIST_TEXT = "🛠️ Contact @admin for assistance"
+MYRAIDS_TEXT = "🎯 Use /list to see active raids you've joined"
+
+_AVAILABLE_COMMANDS = (
+    "📋 **Available Commands:**\n"
+    "• /start - Start bot\n"
+    "• /help - Show help\n"
+    "• /nickname <name> <code> - Register\n"
+    "• /gamer <level> <team> - Set level & team\n"
+    "• /myprofile - Check profile\n"
+    "• /newraid <pokemon> <boosted> <time> - Create raid\n"
+    "• /list - Show active raids\n\n"
+)
+
+ONLY_COMMANDS_WARNING = (
+    "⚠️ **Only raid commands are allowed!**\n\n"
+    + _AVAILABLE_COMMANDS
+    + "💡 **Example:** /newraid Heatran yes 5"
+)
+
+_UNKNOWN_COMMAND_HEAD = "❌ **Unknown command: "
+_UNKNOWN_COMMAND_TAIL = "**\n\n" + _AVAILABLE_COMMANDS + "💡 **Use /help for more info**"
+
+
+def welcome_member_text(first_name: str) -> str:
+    return _WELCOME_MEMBER_HEAD + first_name + _WELCOME_MEMBER_TAIL
+
+
+def unknown_command_warning(command: str) -> str:
+    return _UNKNOWN_COMMAND_HEAD + command + _UNKNOWN_COMMAND_TAIL
+
+
+# ---- kartu raid ----
+
+# Urutan bagian di kartu: (status, judul)
+RAID_SECTIONS = (
+    ('going', "✅ **Going:**\n"),
+    ('maybe', "❓ **Maybe:**\n"),
+    ('plus1', "👥 **+1:**\n"),
+)
+STATUS_EMOJI = {'going': "✅", 'maybe': "❓", 'plus1': "👥"}
+
+_ORGANIZING_FOOTER = "**Status:** Organizing - Stay online!\n"
+_LOBBIES_TITLE = "🏟️ **Lobbies:**\n"
+_JOIN_HINT = "\nUse buttons below to join the raid!"
+
+# Keyboard tidak pernah berubah selama raid hidup (InlineKeyboardMarkup immutable),
+# jadi cukup dibuat sekali per raid_id dan dibuang saat raid selesai
+_keyboards: Dict[str, InlineKeyboardMarkup] = {}
+
+
+def raid_keyboard(raid_id: str) -> InlineKeyboardMarkup:
+    markup = _keyboards.get(raid_id)
+    if markup is None:
+        markup = InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Yes", callback_data=f"join_{raid_id}"),
+            InlineKeyboardButton("❌ No", callback_data=f"leave_{raid_id}"),
+            InlineKeyboardButton("❓ Maybe", callback_data=f"maybe_{raid_id}"),
+            InlineKeyboardButton("👥 +1", callback_data=f"plus1_{raid_id}"),
+        ], [
+            InlineKeyboardButton("🙋 Host", callback_data=f"host_{raid_id}"),
+        ]])
+        _keyboards[raid_id] = markup
+    return markup
+
+
+def forget_keyboard(raid_id: str):
+    _keyboards.pop(raid_id, None)
+
+
+def keyboard_cache_size() -> int:
+    return len(_keyboards)
+
+
+def _header(raid: RaidState) -> str:
+    initiator_name, initiator_code, initiator_level, initiator_team = raid.initiator
+    return (f"**{raid.raid_id}:** {raid.pokemon_name} {'☀️ BOOSTED' if raid.is_boosted else '⚡ NORMAL'}\n\n"
+            f"**Initiator:** {initiator_name} (Lvl {initiator_level} {initiator_team})\n"
+            f"**Trainer Code:** `{initiator_code}`\n"
+            f"**Invites in:** {raid.invite_time} minutes\n")
+
+
+def _participant_line(p: Participant) -> str:
+    return f"• {p.in_game_name} {STATUS_EMOJI[p.status]} Lvl {p.trainer_level} {p.team_color} - `{p.trainer_code}`\n"
+
+
+def _lobby_line(raid: RaidState, number: int, lobby: Lobby, size: int) -> str:
+    """Satu lobby: nomor, kursi terisi, host, lalu nama trainer yang perlu diundang host"""
+    host = raid.participants.get(lobby.host_id) if lobby.host_id is not None else None
+    host_text = f"host {host.in_game_name}" if host is not None else "🙋 needs a host!"
+    guests = ", ".join(
+        raid.participants[user_id].in_game_name + (" +1" if seats > 1 else "")
+        for user_id, seats in lobby.members.items()
+        if user_id != lobby.host_id and user_id in raid.participants
+    )
+    line = f"**Lobby {number}** ({lobby.used}/{size}) - {host_text}\n"
+    return line + guests + "\n" if guests else line
+
+
+class RaidCard:
+    """Hasil render kartu raid yang di-update sedikit demi sedikit.
+
+    Baris tiap peserta disimpan per bagian (dict terurut user_id -> baris), jadi
+    join/leave cukup menambah atau membuang satu baris. Teks bagian hanya
+    digabung ulang kalau isinya berubah; bagian lain dipakai apa adanya.
+    Bagian lobby (kalau raid terbagi ke lebih dari satu lobby) juga begitu:
+    hanya baris lobby yang berubah yang di-render ulang.
+    """
+    __slots__ = ('header', 'lines', 'section_text', 'status_of', 'dirty', 'lobby_text')
+
+    def __init__(self, raid: RaidState):
+        self.header = _header(raid)
+        self.lines: Dict[str, Dict[int, str]] = {status: {} for status, _ in RAID_SECTIONS}
+        self.section_text: Dict[str, str] = {}
+        self.status_of: Dict[int, str] = {}
+        self.dirty = set(self.lines)
+        self.lobby_text = ""
+        for p in raid.participants.values():
+            self._insert(p)
+        raid.changes.clear()
+        if raid.lobbies is not None:
+            raid.lobbies.changed = True
+
+    def _insert(self, p: Participant):
+        lines = self.lines.get(p.status)
+        if lines is not None:
+            lines[p.user_id] = _participant_line(p)
+            self.status_of[p.user_id] = p.status
+            self.dirty.add(p.status)
+
+    def _remove(self, user_id: int):
+        status = self.status_of.pop(user_id, None)
+        if status is not None:
+            del self.lines[status][user_id]
+            self.dirty.add(status)
+
+    def update(self, raid: RaidState):
+        """Terapkan perubahan peserta yang dicatat di raid.changes"""
+        for user_id, moved in raid.changes.items():
+            p = raid.participants.get(user_id)
+            if p is not None and not moved and self.status_of.get(user_id) == p.status:
+                # Profil berubah: ganti baris di tempat, posisi tetap
+                self.lines[p.status][user_id] = _participant_line(p)
+                self.dirty.add(p.status)
+            else:
+                self._remove(user_id)
+                if p is not None:
+                    self._insert(p)
+            if user_id == raid.initiator_id:
+                self.header = _header(raid)
+        raid.changes.clear()
+        for status, title in RAID_SECTIONS:
+            if status in self.dirty:
+                self.section_text[status] = title + "".join(self.lines[status].values())
+        self.dirty.clear()
+
+        lobbies = raid.lobbies
+        if lobbies is not None and lobbies.changed:
+            lobbies.changed = False
+            if len(lobbies) > 1:
+                for number, lobby in enumerate(lobbies.lobbies, 1):
+                    if lobby.text is None:
+                        lobby.text = _lobby_line(raid, number, lobby, lobbies.size)
+                self.lobby_text = _LOBBIES_TITLE + "".join(lobby.text for lobby in lobbies.lobbies)
+            else:
+                self.lobby_text = ""
+
+
+def render_raid_text(raid: RaidState, new: bool = False) -> str:
+    """Teks kartu raid dari model peserta (new=True untuk pesan pertama saat raid dibuat)"""
+    card = raid.card
+    if card is None:
+        card = raid.card = RaidCard(raid)
+    card.update(raid)
+
+    if new:
+        # Kartu baru hanya berisi initiator di bagian Going
+        return (card.header + _ORGANIZING_FOOTER + "\n" + card.section_text['going'] + _JOIN_HINT)
+    # Semua bagian tetap tampil (perilaku kartu lama), dipisah baris kosong
+    parts = [card.header]
+    for status, _ in RAID_SECTIONS:
+        parts.append("\n")
+        parts.append(card.section_text[status])
+    if card.lobby_text:
+        parts.append("\n")
+        parts.append(card.lobby_text)
+    return "".join(parts).rstrip()
+
+
+def render_raid_card(raid: RaidState, new: bool = False) -> Tuple[str, InlineKeyboardMarkup]:
+    """Teks dan keyboard kartu raid"""
+    return render_raid_text(raid, new), raid_keyboard(raid.raid_id)
+
+
+def render_expired_text(raid: RaidState) -> str:
+    """Teks penutup kartu raid setelah expired (tanpa tombol)"""
+    return (f"**{raid.raid_id}:** {raid.pokemon_name} {'☀️ BOOSTED' if raid.is_boosted else '⚡ NORMAL'}\n\n"
+            f"⌛ **Expired** - this raid is closed.\n"
+            f"✅ {raid.count('going')} going | ❓ {raid.count('maybe')} maybe | 👥 {raid.count('plus1')} +1")
+
+
+# ---- /list ----
+
+LIST_PAGE_SIZE = 10
+# callback_data tombol halaman: list:<n|p>:<expires_at>:<raid_id> (kunci keyset)
+LIST_CALLBACK_PREFIX = "list:"
+_LIST_TITLE = "🔥 **ACTIVE RAIDS** 🔥\n\n"
+NO_RAIDS_TEXT = "📭 No active raids found!"
+
+
+def render_raid_list(raids: List[ActiveRaid], now: float, filter_text: str = "") -> str:
+    parts = [_LIST_TITLE]
+    if filter_text:
+        parts.append(f"🔍 Filter: {escape_markdown(filter_text)}\n\n")
+    for raid_id, pokemon_name, is_boosted, invite_time, initiator, count, expires_at in raids:
+        boosted_emoji = "☀️" if is_boosted else "⚡"
+        # Sisa waktu (expires_at epoch UTC, sama seperti time.time())
+        minutes_left = max(0, int((expires_at - now) / 60))
+        parts.append(f"**{raid_id}:** {pokemon_name} {boosted_emoji}\n"
+                     f"By: {initiator} | ⏰ {minutes_left}min left | 👥 {count} participants\n\n")
+    return "".join(parts)
+
+
+def list_keyboard(raids: List[ActiveRaid], has_prev: bool, has_next: bool) -> Optional[InlineKeyboardMarkup]:
+    """Tombol Prev/Next; kursornya raid pertama/terakhir di halaman ini"""
+    buttons = []
+    if has_prev and raids:
+        first = raids[0]
+        buttons.append(InlineKeyboardButton(
+            "◀️ Prev", callback_data=f"{LIST_CALLBACK_PREFIX}p:{first.expires_at}:{first.raid_id}"))
+    if has_next and raids:
+        last = raids[-1]
+        buttons.append(InlineKeyboardButton(
+            "Next ▶️", callback_data=f"{LIST_CALLBACK_PREFIX}n:{last.expires_at}:{last.raid_id}"))
+    return InlineKeyboardMarkup([buttons]) if buttons else None